@@ -1,6 +1,7 @@
 import requests
 import logging
 import os
+import json
 from dotenv import load_dotenv
 
 # Set up logging
@@ -14,7 +15,104 @@ logger = logging.getLogger(__name__)
 _ = load_dotenv()
 API_URL = os.getenv("API_URL", "http://127.0.0.1:5000")
 
-def process_message(message, conversation_history=None):
+def is_appointment_intent(detected_intent, message):
+    """Check if this is any kind of appointment-related request"""
+    # Fallback keyword-based detection
+    appointment_keywords = [
+        "cancel", "cancellation", "取消", "终止", "撤销",
+        "schedule", "book", "appointment", "预约", "约", "预定",
+        "check", "status", "history", "查询", "状态", "历史"
+    ]
+    return (
+        detected_intent in ["cancel_appointment", "schedule_appointment", "check_status"] or
+        any(k in message.lower() for k in appointment_keywords)
+    )
+
+def _read_events(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data_lines.append(value)
+            continue
+        if data_lines:
+            yield event, json.loads("\n".join(data_lines))
+        event, data_lines = "message", []
+
+def stream_message(message, session_id=None):
+    """
+    Send a message to the streaming endpoint
+
+    Returns as soon as the intent event arrives; 'stream' then yields the
+    answer text as it is generated (suitable for st.write_stream). The
+    backend keeps the conversation history under 'session_id'; pass it back
+    with the next message (None starts a new session).
+    """
+    try:
+        logger.info(f"Streaming message: {message[:30]}...")
+        response = requests.post(
+            f"{API_URL}/query/stream",
+            json={
+                "query": message,
+                "session_id": session_id or ""
+            },
+            stream=True
+        )
+        response.raise_for_status()
+        events = _read_events(response)
+        
+        detected_intent = ""
+        for event, data in events:
+            if event == "intent":
+                detected_intent = data.get("intent", "")
+                session_id = data.get("session_id", session_id)
+                break
+            if event == "error":
+                raise requests.exceptions.RequestException(data.get("error"))
+        
+        def tokens():
+            try:
+                for event, data in events:
+                    if event == "token":
+                        yield data.get("text", "")
+                    elif event == "error":
+                        logger.error(f"Error event from API: {data.get('error')}")
+                        yield "\n\n⚠️ I encountered an error. Please try again."
+                    elif event == "done":
+                        break
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Stream interrupted: {str(e)}")
+                yield "\n\n⚠️ The connection was interrupted. Please try again."
+            finally:
+                response.close()
+        
+        return {
+            'success': True,
+            'intent': detected_intent,
+            'is_appointment_intent': is_appointment_intent(detected_intent, message),
+            'session_id': session_id,
+            'stream': tokens()
+        }
+        
+    except requests.exceptions.ConnectionError:
+        logger.error("Connection error while querying API")
+        return {
+            'success': False,
+            'message': "⚠️ **Connection Error**\n\nI couldn't connect to the server. Please make sure the server is running and try again."
+        }
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error querying API: {str(e)}")
+        return {
+            'success': False,
+            'message': f"⚠️ **Error**\n\nI encountered an error: {str(e)}\n\nPlease try again."
+        }
+
+def process_message(message, session_id=None):
     """Process user message and detect intent"""
     try:
         logger.info(f"Processing message: {message[:30]}...")
@@ -24,7 +122,7 @@ def process_message(message, conversation_history=None):
             f"{API_URL}/query",
             json={
                 "query": message,
-                "conversation_history": conversation_history or []
+                "session_id": session_id or ""
             }
         )
         response.raise_for_status()
@@ -33,23 +131,11 @@ def process_message(message, conversation_history=None):
         # Get LLM intent detection result
         detected_intent = response_data.get("intent", "")
         
-        # Fallback keyword-based detection
-        appointment_keywords = [
-            "cancel", "cancellation", "取消", "终止", "撤销",
-            "schedule", "book", "appointment", "预约", "约", "预定",
-            "check", "status", "history", "查询", "状态", "历史"
-        ]
-        
-        # Check if this is any kind of appointment-related request
-        is_appointment_intent = (
-            detected_intent in ["cancel_appointment", "schedule_appointment", "check_status"] or
-            any(k in message.lower() for k in appointment_keywords)
-        )
-        
         return {
             'success': True,
             'intent': detected_intent,
-            'is_appointment_intent': is_appointment_intent,
+            'is_appointment_intent': is_appointment_intent(detected_intent, message),
+            'session_id': response_data.get("session_id", session_id),
             'response': response_data.get("answer", "I apologize, but I didn't understand that. Could you please rephrase your question?")
         }
         
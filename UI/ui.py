@@ -14,7 +14,7 @@ from services.appointment_service import (
     get_appointment_history,
     reset_states as reset_service_states
 )
-from services.message_service import process_message
+from services.message_service import stream_message
 from ui_components import (
     display_appointment_history,
     create_confirmation_message,
@@ -435,12 +435,6 @@ with chat_container:
         elif st.session_state.get('appointment_flow_state') == 'status_check':
             handle_status_check()
     
-    # Show loading message if thinking
-    if st.session_state["thinking"]:
-        with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                st.empty()
-
     # User input field with placeholder
     if user_input := st.chat_input("Type your message here...", key="user_input"):
         logger.info(f"Received user input: {user_input[:30]}...")
@@ -455,23 +449,28 @@ if st.session_state["thinking"]:
         last_message = st.session_state["messages"][-1]["content"]
         logger.info(f"Processing user message: {last_message[:30]}...")
         
-        # Process the message
-        result = process_message(
-            last_message,
-            st.session_state["messages"][-5:] if len(st.session_state["messages"]) > 1 else []
-        )
-        
-        if result['success']:
-            chatbot_reply = result['response']
-            
-            # Handle appointment-related intents
-            if result['is_appointment_intent']:
-                logger.info("Detected appointment-related intent")
-                st.session_state['service_selection_state'] = 'initial'
-                chatbot_reply = """I'll help you with your appointment. Please provide your information and select what you'd like to do below:
+        # Process the message; the answer is rendered token by token as it streams in
+        with chat_container:
+            with st.chat_message("assistant"):
+                with st.spinner("Thinking..."):
+                    # The backend keeps the conversation; only the session id is sent
+                    result = stream_message(last_message, st.session_state.get("session_id"))
+                
+                if result['success']:
+                    st.session_state["session_id"] = result['session_id']
+                    # Handle appointment-related intents
+                    if result['is_appointment_intent']:
+                        logger.info("Detected appointment-related intent")
+                        # Drain the remaining events so the connection is released
+                        for _ in result['stream']:
+                            pass
+                        st.session_state['service_selection_state'] = 'initial'
+                        chatbot_reply = """I'll help you with your appointment. Please provide your information and select what you'd like to do below:
 我将帮您处理预约事宜。请在下方提供您的信息并选择您想进行的操作："""
-        else:
-            chatbot_reply = result['message']
+                    else:
+                        chatbot_reply = st.write_stream(result['stream'])
+                else:
+                    chatbot_reply = result['message']
             
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
@@ -518,7 +517,8 @@ def reset_all_states() -> None:
         'form_submitted',
         'form_data',
         'cancel_form_data',
-        'available_slots'
+        'available_slots',
+        'session_id'
     ]
     
     for state in states_to_clear:
@@ -1,18 +1,27 @@
 import os
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from openai import OpenAI
 from dotenv import load_dotenv, find_dotenv
 from datetime import datetime
-from app.services.chat import ChatService
-from app.services.intent_detection import IntentDetectionService
+from typing import Callable, Optional
+from app.services.chat import ChatService, ERROR_RESPONSE
+from app.services.answer_cache import create_answer_cache, is_context_free
+from app.services.intent_detection import IntentDetectionService, APPOINTMENT_INTENTS, RULE_ENGINE
 from app.services.vector_store import VectorStoreService
 from app.services.appointment_service import AppointmentService
+from app.services.registry import ServiceRegistry, ServiceUnavailable
+from app.services.session_store import create_session_store, fit_to_budget
+from app.services.conversation_summary import create_conversation_summarizer
+from app.services.price_answering import create_price_answering
+from app.models.request_context import RequestContext
 from app.utils.database.db_utils import init_db
-from app.config.settings import DB_PATH, MODEL_CONFIG, SYSTEM_PROMPT, SMTP_CONFIG
+from app.utils import metrics
+from app.config.settings import DB_PATH, MODEL_CONFIG, SYSTEM_PROMPT, SMTP_CONFIG, SERVING_CONFIG, METRICS_CONFIG, SESSION_CONFIG
 import sqlite3
 import requests
+import json
+import time
 
 # Set up logging
 logging.basicConfig(
@@ -27,19 +36,58 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("OpenAI API key is missing. Please set it in .env")
 
-# Initialize OpenAI client
-client = OpenAI()
-
 app = Flask(__name__)
 CORS(app)
 
+@app.before_request
+def start_timer():
+    request.environ["metrics.start"] = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = request.environ.get("metrics.start")
+    if METRICS_CONFIG['ENABLED'] and start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - start
+        )
+    return response
+
 # Initialize services
+# The retrieval stack (embeddings, cross-encoder, LLM clients) is warmed up in the
+# background so the appointment endpoints can serve as soon as the port is bound.
 logger.info("Initializing services...")
-chat_service = ChatService()
-intent_detector = IntentDetectionService()
-vector_store = VectorStoreService()
 appointment_service = AppointmentService()
-logger.info("Services initialized successfully")
+session_store = create_session_store()
+summarizer = create_conversation_summarizer(session_store)
+price_answering = create_price_answering()
+services = ServiceRegistry()
+services.register("vector_store", VectorStoreService)
+services.register("intent_detector", IntentDetectionService)
+services.register("chat", ChatService)
+services.register("answer_cache", lambda: create_answer_cache(services.get("vector_store").embed_query))
+services.start_warmup()
+logger.info("Appointment service ready, retrieval stack warming up in the background")
+
+def service_unavailable(e: ServiceUnavailable):
+    """Shed a request whose services are not warm yet"""
+    logger.warning(f"Service unavailable: {str(e)}")
+    response = jsonify({"error": str(e), "services": services.status()})
+    response.headers["Retry-After"] = str(SERVING_CONFIG['RETRY_AFTER_SECONDS'])
+    return response, 503
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness of each component; 503 until the retrieval stack is warm"""
+    status = services.status()
+    status["appointment_service"] = {"state": "ready"}
+    ready = services.is_ready()
+    return jsonify({"ready": ready, "services": status}), (200 if ready else 503)
 
 @app.route('/detect_intent', methods=['POST'])
 def detect_intent_route():
@@ -49,13 +97,185 @@ def detect_intent_route():
             return jsonify({"error": "No query provided"}), 400
         
         user_query = data.get("query")
-        intent_data = intent_detector.detect_intent(user_query)
+        intent_detector = services.get("intent_detector", timeout=SERVING_CONFIG['READY_TIMEOUT_SECONDS'])
+        ctx = RequestContext(query=user_query)
+        with ctx.stage("intent"):
+            intent_data = intent_detector.detect_intent(user_query, ctx)
+        metrics.record_request(ctx)
         return jsonify({"intent_data": intent_data})
         
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
         logger.error(f"Error in detect_intent: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/intent_rules', methods=['GET'])
+def intent_rules():
+    """Per-rule hit counters of the intent rule engine, for tuning the rules"""
+    return jsonify(RULE_ENGINE.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latency, token, cost, SQLite and SMTP metrics in the Prometheus text format"""
+    if not METRICS_CONFIG['ENABLED']:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/response_cache', methods=['GET'])
+def response_cache_stats():
+    """Hit, miss and coalescing counters of the exact-match response cache"""
+    if not services.is_ready(["chat"]):
+        return jsonify({"error": "Chat service is warming up", "services": services.status()}), 503
+    response_cache = services.get("chat").response_cache
+    return jsonify(response_cache.stats() if response_cache is not None else {"enabled": False})
+
+@app.route('/rerank_cache', methods=['GET'])
+def rerank_cache_stats():
+    """Size, hit and miss counters of the cross-encoder score cache"""
+    if not services.is_ready(["vector_store"]):
+        return jsonify({"error": "Vector store is warming up", "services": services.status()}), 503
+    return jsonify(services.get("vector_store").rerank_cache.stats())
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def session_stats(session_id):
+    """Turn, token and summary savings counts of a conversation session"""
+    if session_store is None:
+        return jsonify({"error": "Sessions are disabled"}), 404
+    try:
+        return jsonify(session_store.stats(session_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def appointment_response(intent: str) -> dict:
+    """Bilingual prompt shown above the appointment form in the UI"""
+    if intent != "schedule_appointment":
+        return {
+            "answer": """I can help you manage your appointments with New Turbo Education.
+
+我可以帮您管理在新突破教育的预约。
+
+Please enter your information and choose an option in the form below:
+请在下方表格中填写您的信息并选择相应的操作：""",
+            "intent": intent
+        }
+
+    bilingual_response = """I'd be happy to help you schedule an appointment with New Turbo Education! Our tutors specialize in SAT, AP, ACT, SHSAT, TOEFL preparation and more. Making an appointment is quick and easy.
+
+我很乐意帮您预约新突破教育的课程！我们的老师专注于SAT、AP、ACT、SHSAT、托福等考试的备考辅导。预约过程简单快捷。
+
+Please select your preferred date and time in the form below:
+请在下方表格中选择您偏好的日期和时间："""
+    
+    return {
+        "answer": bilingual_response,
+        "intent": "schedule_appointment"
+    }
+
+def is_appointment(intent_data: dict, chat_service: ChatService) -> bool:
+    return (intent_data.get("intent") in APPOINTMENT_INTENTS and
+            intent_data.get("confidence", 0) > chat_service.confidence_threshold_medium)
+
+def build_answer(ctx: RequestContext) -> dict:
+    """Run intent detection and answer generation for a /query request"""
+    chat_service = services.get("chat")
+    structured = None
+    if MODEL_CONFIG['GENERATION_MODE'] == 'structured':
+        # One model call returns both the intent and the answer
+        structured = chat_service.get_structured_completion(ctx.query, ctx.conversation_history, ctx)
+        intent_data = ctx.intent
+    else:
+        # Use hybrid intent detection approach; the result is kept on ctx for get_completion
+        intent_data = chat_service.get_hybrid_intent(ctx.query, ctx.conversation_history, ctx)
+    logger.info(f"Intent detected: {intent_data.get('intent')} with confidence {intent_data.get('confidence', 0)}")
+    
+    # If it's an appointment intent, return special response
+    if is_appointment(intent_data, chat_service):
+        # Context prefetched during intent detection is not needed
+        ctx.cancel_pending()
+        return appointment_response(intent_data.get("intent"))
+    
+    # Otherwise proceed with regular query
+    if structured is not None:
+        answer = structured["answer"]
+    else:
+        answer = chat_service.get_completion(ctx.query, ctx.conversation_history, ctx)
+    return {
+        "answer": answer, 
+        "intent": intent_data.get("intent", "general_query")
+    }
+
+def refresher(ctx: RequestContext) -> Callable[[], dict]:
+    """
+    Background refresh of a stale cache entry (runs on the cache's own threads)
+
+    The request's own context is logged and recorded before the refresh runs,
+    so the refresh answers on a fresh one and records its stages and tokens itself.
+    """
+    def refresh() -> dict:
+        refresh_ctx = RequestContext(query=ctx.query, conversation_history=ctx.conversation_history)
+        result = build_answer(refresh_ctx)
+        metrics.record_request(refresh_ctx)
+        return result
+    return refresh
+
+def direct_price_answer(ctx: RequestContext) -> Optional[dict]:
+    """
+    Template answer for a direct price lookup ("SAT 1on1 多少钱"), or None
+
+    Needs neither the retrieval stack nor a model call, so it is tried
+    before both.
+    """
+    if price_answering is None:
+        return None
+    with ctx.stage("price_lookup"):
+        answer = price_answering.answer(ctx.query)
+    if answer is None:
+        return None
+    ctx.intent = {"intent": "price_query", "confidence": 1.0, "explanation": "Direct price lookup"}
+    return {"answer": answer, "intent": "price_query"}
+
+def is_cacheable(result: dict) -> bool:
+    return result.get("answer") != ERROR_RESPONSE
+
+def resolve_history(data: dict) -> tuple:
+    """
+    Session id and conversation history for a /query body
+
+    A body with a "session_id" key (empty for a new conversation) uses the
+    server-side session store; otherwise the client's conversation_history
+    is used. Either way, only the most recent turns within the history token
+    budget are kept.
+
+    Returns:
+        (session_id, conversation_history); session_id is None without a session
+
+    Raises:
+        ValueError: If the session id is malformed
+    """
+    if session_store is not None and "session_id" in data:
+        session_id = data["session_id"] or session_store.new_session_id()
+        return session_id, session_store.history(session_id)
+    history = data.get("conversation_history") or []
+    return None, fit_to_budget(history, SESSION_CONFIG['HISTORY_TOKEN_BUDGET'])
+
+def remember_exchange(session_id: str, data: dict, result: dict) -> None:
+    """
+    Append a question and its answer to the session (failed answers are not kept)
+
+    Called once the answer is complete; a summary of older turns, if due, is
+    written in the background for the next request.
+    """
+    if session_id is None or result is None or result.get("answer") == ERROR_RESPONSE:
+        return
+    try:
+        session_store.append_exchange(session_id, data["query"].strip(), result["answer"])
+    except Exception as e:
+        logger.error(f"Error saving session {session_id}: {str(e)}")
+        return
+    if summarizer is not None:
+        summarizer.schedule(session_id)
+
 @app.route('/query', methods=['POST'])
 def answer_query():
     try:
@@ -65,36 +285,147 @@ def answer_query():
             return jsonify({"error": "No query provided"}), 400
         
         user_query = data.get("query").lower().strip()
-        conversation_history = data.get("conversation_history", [])
-        
-        # Use hybrid intent detection approach
-        intent_data = chat_service.get_hybrid_intent(user_query, conversation_history)
-        logger.info(f"Hybrid intent detected: {intent_data.get('intent')} with confidence {intent_data.get('confidence', 0)}")
+        try:
+            session_id, conversation_history = resolve_history(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        ctx = RequestContext(query=user_query, conversation_history=conversation_history)
         
-        # If it's an appointment intent, return special response
-        if intent_data.get("intent") == "schedule_appointment" and intent_data.get("confidence", 0) > chat_service.confidence_threshold_medium:
-            bilingual_response = """I'd be happy to help you schedule an appointment with New Turbo Education! Our tutors specialize in SAT, AP, ACT, SHSAT, TOEFL preparation and more. Making an appointment is quick and easy.
+        with ctx.stage("total"):
+            result = direct_price_answer(ctx)
+        if result is None:
+            # Wait briefly for the retrieval stack, then shed with 503 + Retry-After
+            # (in warm-up order, so a request never builds a component the warm-up thread is building)
+            timeout = SERVING_CONFIG['READY_TIMEOUT_SECONDS']
+            vector_store = services.get("vector_store", timeout=timeout)
+            services.get("intent_detector", timeout=timeout)
+            services.get("chat", timeout=timeout)
+            answer_cache = services.get("answer_cache", timeout=timeout)
+            
+            # Answers that do not depend on earlier turns can be served from the semantic cache
+            with ctx.stage("total"):
+                if answer_cache is not None and is_context_free(user_query, conversation_history):
+                    result = answer_cache.get_or_compute(
+                        user_query,
+                        answer_cache.scope_for(vector_store.knowledge_version),
+                        lambda: build_answer(ctx),
+                        cacheable=is_cacheable,
+                        refresh=refresher(ctx)
+                    )
+                else:
+                    result = build_answer(ctx)
+        remember_exchange(session_id, data, result)
+        logger.info(f"Request {ctx.request_id}: {ctx.server_timing()}, {ctx.total_tokens()} tokens ({ctx.cached_tokens()} cached)")
+        metrics.record_request(ctx)
+        if session_id is not None:
+            result = {**result, "session_id": session_id}
+        response = jsonify(result)
+        if SERVING_CONFIG['TIMING_HEADER']:
+            response.headers["Server-Timing"] = ctx.server_timing()
+        return response
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error in answer_query: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-我很乐意帮您预约新突破教育的课程！我们的老师专注于SAT、AP、ACT、SHSAT、托福等考试的备考辅导。预约过程简单快捷。
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-Please select your preferred date and time in the form below:
-请在下方表格中选择您偏好的日期和时间："""
-            
-            return jsonify({
-                "answer": bilingual_response,
-                "intent": "schedule_appointment"
-            })
+@app.route('/query/stream', methods=['POST'])
+def stream_query():
+    """
+    Streaming variant of /query as Server-Sent Events
+
+    Emits an "intent" event first, then "token" events carrying answer text
+    as the model generates it, then "done". Direct price lookups, cached,
+    appointment and structured-mode answers arrive as a single token event.
+    """
+    try:
+        data = request.json
+        if not data or 'query' not in data:
+            logger.warning("No query provided")
+            return jsonify({"error": "No query provided"}), 400
         
-        # Otherwise proceed with regular query
-        answer = chat_service.get_completion(user_query, conversation_history)
-        return jsonify({
-            "answer": answer, 
-            "intent": intent_data.get("intent", "general_query")
-        })
+        user_query = data.get("query").lower().strip()
+        try:
+            session_id, conversation_history = resolve_history(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        ctx = RequestContext(query=user_query, conversation_history=conversation_history)
+        
+        direct = direct_price_answer(ctx)
+        vector_store = chat_service = answer_cache = None
+        if direct is None:
+            timeout = SERVING_CONFIG['READY_TIMEOUT_SECONDS']
+            vector_store = services.get("vector_store", timeout=timeout)
+            services.get("intent_detector", timeout=timeout)
+            chat_service = services.get("chat", timeout=timeout)
+            answer_cache = services.get("answer_cache", timeout=timeout)
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error in answer_query: {str(e)}")
+        logger.error(f"Error in stream_query: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+    use_cache = answer_cache is not None and is_context_free(user_query, conversation_history)
+    scope = answer_cache.scope_for(vector_store.knowledge_version) if use_cache else None
+    session = {"session_id": session_id} if session_id is not None else {}
+
+    def generate():
+        start = time.perf_counter()
+        result = None
+        try:
+            result = direct
+            if result is None and use_cache:
+                result = answer_cache.get(user_query, scope, refresh=refresher(ctx), cacheable=is_cacheable)
+            if result is None and MODEL_CONFIG['GENERATION_MODE'] == 'structured':
+                # The answer arrives inside one JSON response, so there is nothing to stream token by token
+                result = build_answer(ctx)
+                if use_cache:
+                    answer_cache.put(user_query, scope, result, cacheable=is_cacheable)
+            if result is not None:
+                yield sse_event("intent", {"intent": result["intent"], **session})
+                yield sse_event("token", {"text": result["answer"]})
+                yield sse_event("done", {"intent": result["intent"], **session})
+                return
+
+            intent_data = chat_service.get_hybrid_intent(ctx.query, ctx.conversation_history, ctx)
+            intent = intent_data.get("intent", "general_query")
+            yield sse_event("intent", {"intent": intent, "confidence": intent_data.get("confidence", 0), **session})
+
+            if is_appointment(intent_data, chat_service):
+                ctx.cancel_pending()
+                result = appointment_response(intent)
+                yield sse_event("token", {"text": result["answer"]})
+            else:
+                parts = []
+                for delta in chat_service.stream_completion(ctx.query, ctx.conversation_history, ctx):
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+                result = {"answer": "".join(parts), "intent": intent}
+                if ERROR_RESPONSE in parts:
+                    result["answer"] = ERROR_RESPONSE
+            yield sse_event("done", {"intent": intent, **session})
+            if use_cache:
+                answer_cache.put(user_query, scope, result, cacheable=is_cacheable)
+        except Exception as e:
+            logger.error(f"Error in stream_query: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+            result = None
+        finally:
+            ctx.timings["total"] = (time.perf_counter() - start) * 1000
+            remember_exchange(session_id, data, result)
+            logger.info(f"Request {ctx.request_id}: {ctx.server_timing()}, {ctx.total_tokens()} tokens ({ctx.cached_tokens()} cached)")
+            metrics.record_request(ctx)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/schedule', methods=['POST'])
 def handle_scheduling():
     try:
@@ -15,6 +15,10 @@ API_URL = os.getenv('API_URL', 'http://127.0.0.1:5000')
 DB_PATH = os.path.join(DATA_DIR, "appointments.db")
 os.makedirs(DATA_DIR, exist_ok=True)  # Ensure data directory exists
 
+# Persisted vector index (kept outside DATA_DIR so it is never ingested)
+STORAGE_DIR = os.path.join(os.path.dirname(BASE_DIR), "storage")
+INDEX_STORAGE_DIR = os.path.join(STORAGE_DIR, "index")
+
 # Data file paths
 PRICES_CSV_PATH = os.path.join(DATA_DIR, "prices.csv")
 BASIC_INFO_PATH = os.path.join(DATA_DIR, "Basic_information.md")
@@ -29,7 +33,38 @@ MODEL_CONFIG = {
     'MODEL_NAME': 'gpt-4o-mini',  # or 'gpt-3.5-turbo'
     'CONFIDENCE_THRESHOLD': 0.7,
     'TEMPERATURE': 0.7,
-    'MAX_TOKENS': 1000
+    'MAX_TOKENS': 1000,
+    # 'pipeline': intent detection, then a separate answer call
+    # 'structured': one JSON-schema call returning intent, confidence and answer
+    'GENERATION_MODE': 'pipeline'
+}
+
+# Shared OpenAI HTTP connection pool (app/utils/openai_client.py)
+OPENAI_CLIENT_CONFIG = {
+    'MAX_CONNECTIONS': 100,
+    'MAX_KEEPALIVE_CONNECTIONS': 20,
+    'KEEPALIVE_EXPIRY_SECONDS': 120,  # keep idle TLS connections across the pauses between chat turns
+    'HTTP2': True,                    # only when the optional h2 package is installed
+    'CONNECT_TIMEOUT_SECONDS': 5,
+    'TIMEOUT_SECONDS': 60,
+    'MAX_RETRIES': 2,
+    # Read timeout per call site, in seconds
+    'CALL_TIMEOUTS': {
+        'intent_detection': 10,
+        'intent_verification': 10,
+        'generation': 60,
+        'summary': 30
+    }
+}
+
+# Knowledge-base ingestion: only files matching an INCLUDE pattern are indexed,
+# with the named loader (see app/services/ingestion.py)
+INGESTION_MANIFEST = {
+    'INCLUDE': [
+        {'pattern': '*.md', 'loader': 'markdown'},    # one document per heading section
+        {'pattern': 'prices.csv', 'loader': 'price_csv'},  # one document per course row
+    ],
+    'EXCLUDE': ['*.db', '*.db-journal', '*.db-wal', '*.db-shm', '*.sqlite*']
 }
 
 # Vector Store Settings 
@@ -37,8 +72,114 @@ VECTOR_STORE_CONFIG = {
     'CHUNK_SIZE': 512,
     'CHUNK_OVERLAP': 100,
     'RERANKER_MODEL': 'BAAI/bge-reranker-large',
+    # Candidates passed to the reranker (after rank fusion when HYBRID_SEARCH is on)
     'TOP_K': 5,
-    'TOP_N': 3
+    'TOP_N': 3,
+    # 'retrieval' passes the reranked chunks straight to the chat model;
+    # 'synthesis' lets LlamaIndex generate an intermediate answer first (one extra LLM call)
+    'RESPONSE_MODE': 'retrieval',
+    # 'numpy' keeps embeddings in a memory-mapped matrix, 'simple' uses LlamaIndex's SimpleVectorStore
+    'VECTOR_STORE_BACKEND': 'numpy',
+    # None (float32), 'float16' or 'int8'
+    'QUANTIZATION': None,
+    # Fuse dense retrieval with a bilingual BM25 index (reciprocal-rank fusion)
+    'HYBRID_SEARCH': True,
+    'BM25_TOP_K': 5,
+    'RRF_K': 60,
+    # Micro-batch reranking across concurrent requests. Off by default: on a single CPU core the
+    # model is compute-bound and batching measured 1.01-1.07x (benchmarks/reranker.py); try it on a GPU
+    'RERANK_BATCHING': False,
+    'RERANK_MAX_BATCH': 32,
+    'RERANK_MAX_WAIT_MS': 5,
+    # LRU entries of (query, chunk) cross-encoder scores
+    'RERANK_CACHE_SIZE': 10000
+}
+
+# Embedding cache shared by index rebuilds and worker processes
+EMBEDDING_CACHE_CONFIG = {
+    'ENABLED': True,
+    'DIR': os.path.join(STORAGE_DIR, "embeddings"),
+    'QUERY_CACHE_SIZE': 1024
+}
+
+# Local nearest-centroid intent classifier; the LLM is only asked when the margin is ambiguous
+INTENT_CLASSIFIER_CONFIG = {
+    'ENABLED': True,
+    'EXEMPLARS_PATH': os.path.join(BASE_DIR, "config", "intent_exemplars.json"),
+    'MARGIN_THRESHOLD': 0.04,  # cosine gap between the two nearest intents
+    'TEMPERATURE': 0.02        # softmax temperature turning cosine scores into a confidence
+}
+
+# Semantic answer cache in front of /query
+ANSWER_CACHE_CONFIG = {
+    'ENABLED': True,
+    'SIMILARITY_THRESHOLD': 0.97,  # cosine similarity of query embeddings
+    'MAX_ENTRIES': 1000,
+    'TTL_SECONDS': 3600,           # served as fresh
+    'STALE_TTL_SECONDS': 86400     # served while refreshed in the background
+}
+
+# Exact-match cache in front of ChatService.get_completion, with request coalescing
+RESPONSE_CACHE_CONFIG = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 2000,
+    'TTL_SECONDS': 600,
+    'SOURCE_CHECK_SECONDS': 2.0  # how often prices.csv is re-stat'ed for changes
+}
+
+# Prometheus-format metrics at GET /metrics (app/utils/metrics.py)
+METRICS_CONFIG = {
+    'ENABLED': True,
+    # USD per 1M tokens, for the estimated cost counter
+    'PRICE_PER_1M_TOKENS': {
+        'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+        'gpt-3.5-turbo': {'input': 0.50, 'cached_input': 0.50, 'output': 1.50}
+    }
+}
+
+# Server-side conversation history keyed by session id (app/services/session_store.py)
+SESSION_CONFIG = {
+    'ENABLED': True,
+    'DB_PATH': os.path.join(STORAGE_DIR, "sessions.db"),
+    'CACHE_SIZE': 1000,             # sessions kept in memory
+    'HISTORY_TOKEN_BUDGET': 1500    # most recent turns sent with a question, in prompt tokens
+}
+
+# Price context for price questions (app/services/price_table.py)
+PRICE_TABLE_CONFIG = {
+    # True: only the rows for the course, format and level asked about, sent after the context.
+    # False: the full table in the system message, which stays identical and is prefix-cached.
+    'FILTER_ROWS': True
+}
+
+# Template answers for direct price lookups, without a model call (app/services/price_answering.py)
+PRICE_ANSWERING_CONFIG = {
+    'ENABLED': True,
+    'FUZZY_THRESHOLD': 0.6,  # trigram similarity for misspelled course names
+    'MAX_ROWS': 6            # more matching rows than this goes to the model
+}
+
+# Rolling summary of older session turns, written in the background after a response
+SUMMARY_CONFIG = {
+    'ENABLED': True,
+    'TRIGGER_TOKENS': 1200,      # unsummarized history size that starts a summary
+    'KEEP_RECENT_TOKENS': 400,   # newest turns always sent verbatim
+    'MAX_SUMMARY_TOKENS': 300,
+    'WORKERS': 2
+}
+
+# Serving behaviour while the retrieval stack warms up
+SERVING_CONFIG = {
+    'READY_TIMEOUT_SECONDS': 10,  # how long /query waits for warm-up before shedding
+    'RETRY_AFTER_SECONDS': 5,
+    'TIMING_HEADER': True,  # per-stage timings of /query in a Server-Timing response header
+    'WSGI_WORKERS': 16      # asgi.py: threads serving the Flask routes (SQLite, SMTP)
+}
+
+# Request pipeline orchestration
+PIPELINE_CONFIG = {
+    'CONCURRENT': True,  # retrieve context while model-based intent detection runs
+    'MAX_WORKERS': 16    # shared pool (app/utils/executor.py)
 }
 
 # SMTP Settings for email
@@ -51,9 +192,9 @@ SMTP_CONFIG = {
 }
 
 # System prompt
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompt.md")
 try:
-    prompt_path = os.path.join(os.path.dirname(__file__), "prompt.md")
-    with open(prompt_path, "r", encoding="utf-8") as f:
+    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
         SYSTEM_PROMPT = f.read().strip()
 except FileNotFoundError:
     SYSTEM_PROMPT = """I am an AI assistant for New Turbo Education, a tutoring center specializing in SAT, AP, ACT, SHSAT, TOEFL, ESL, and college admissions consulting. I provide bilingual responses in English and Chinese to help both parents and students. I aim to be professional, friendly and helpful in answering questions about courses, tutoring, pricing, schedules and other education-related topics."""
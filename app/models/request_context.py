@@ -0,0 +1,66 @@
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class RequestContext:
+    """
+    State of one /query request shared by the route, ChatService and VectorStoreService
+
+    Each stage stores its result here (intent, retrieved chunks) so later
+    stages reuse it instead of recomputing, and records its wall time and
+    OpenAI token usage. retrieval holds the future of a retrieval started
+    ahead of time, while intent detection is still running.
+    """
+    query: str
+    conversation_history: List[dict] = field(default_factory=list)
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    intent: Optional[dict] = None
+    nodes: Optional[List[dict]] = None
+    retrieval: Optional[Future] = None
+    token_usage: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage in milliseconds (repeated stages accumulate)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def cancel_pending(self) -> None:
+        """Drop background work the request turned out not to need"""
+        if self.retrieval is not None and self.retrieval.cancel():
+            self.retrieval = None
+
+    def add_usage(self, call_site: str, usage) -> None:
+        """
+        Accumulate the usage object of an OpenAI response under its call site
+
+        cached_tokens is the part of prompt_tokens served from the provider's
+        prompt-prefix cache (0 when the prompt is too short or the prefix is new).
+        """
+        if usage is None:
+            return
+        totals = self.token_usage.setdefault(call_site, {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+        totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        totals["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        totals["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+    def total_tokens(self) -> int:
+        return sum(usage["prompt_tokens"] + usage["completion_tokens"] for usage in self.token_usage.values())
+
+    def cached_tokens(self) -> int:
+        return sum(usage["cached_tokens"] for usage in self.token_usage.values())
+
+    def server_timing(self) -> str:
+        """Timings formatted for the Server-Timing response header"""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in dict(self.timings).items())
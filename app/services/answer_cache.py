@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.config.settings import ANSWER_CACHE_CONFIG, SYSTEM_PROMPT
+from app.services.price_table import parse_price_query
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PROMPT_HASH = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+
+def is_context_free(query: str, conversation_history: list = None) -> bool:
+    """
+    True when the answer cannot depend on earlier turns
+
+    The UI sends the current message as part of the history, so a history
+    whose only user message is the query itself still counts as context-free.
+    """
+    normalized = " ".join(query.lower().split())
+    for msg in conversation_history or []:
+        if msg.get("role") == "user" and " ".join(str(msg.get("content", "")).lower().split()) != normalized:
+            return False
+    return True
+
+
+def price_entities(query: str) -> tuple:
+    """
+    Course families, formats and levels named in the query
+
+    "SAT 1on1 price" and "SAT 1on2 price" (or "SAT" and "SHSAT") embed almost
+    identically but have different answers, so only entries naming the same
+    entities can match.
+    """
+    parsed = parse_price_query(query)
+    return tuple(sorted(parsed.families)), tuple(sorted(parsed.formats)), tuple(sorted(parsed.levels))
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache matched by cosine similarity of query embeddings
+
+    Entries belong to a scope (knowledge-base version + system prompt hash);
+    a scope change drops every entry. Within a scope, a query only matches
+    entries naming the same price entities (price_entities). Entries older than ttl_seconds are still
+    served for stale_ttl_seconds while a background refresh recomputes them.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], similarity_threshold: float,
+                 max_entries: int, ttl_seconds: float, stale_ttl_seconds: float):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-cache-refresh")
+        self._scope = None
+        self._entries = []
+        self._matrix = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope_for(knowledge_version: str) -> str:
+        return f"{knowledge_version}:{PROMPT_HASH}"
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error embedding query for answer cache: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _reset_if_scope_changed(self, scope: str) -> None:
+        if scope != self._scope:
+            if self._entries:
+                logger.info("Knowledge base or prompt changed, clearing answer cache")
+            self._scope = scope
+            self._entries = []
+            self._matrix = None
+
+    def _best_match(self, vector: np.ndarray, entities: tuple):
+        if self._matrix is None:
+            return None
+        scores = self._matrix @ vector
+        same_entities = np.fromiter((entry["entities"] == entities for entry in self._entries),
+                                    dtype=bool, count=len(self._entries))
+        scores = np.where(same_entities, scores, -1.0)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return self._entries[best]
+
+    def _store(self, query: str, vector: np.ndarray, entities: tuple, result: dict) -> None:
+        entry = {"query": query, "entities": entities, "result": result, "created": time.monotonic(),
+                 "refreshing": False}
+        self._entries.append(entry)
+        rows = [vector] if self._matrix is None else [self._matrix, vector[None, :]]
+        self._matrix = np.vstack(rows)
+        if len(self._entries) > self.max_entries:
+            # Drop the oldest entry
+            self._entries.pop(0)
+            self._matrix = self._matrix[1:]
+
+    def _refresh(self, entry: dict, scope: str, compute: Callable[[], dict],
+                 cacheable: Callable[[dict], bool]) -> None:
+        try:
+            result = compute()
+            if not cacheable(result):
+                return
+            with self._lock:
+                if self._scope == scope:
+                    entry["result"] = result
+                    entry["created"] = time.monotonic()
+            logger.info(f"Refreshed cached answer for: {entry['query'][:50]}")
+        except Exception as e:
+            logger.error(f"Error refreshing cached answer: {str(e)}")
+        finally:
+            # get() checks and sets the flag under the lock too
+            with self._lock:
+                entry["refreshing"] = False
+
+    def get(self, query: str, scope: str, refresh: Optional[Callable[[], dict]] = None,
+            cacheable: Callable[[dict], bool] = lambda result: True) -> Optional[dict]:
+        """
+        Return the cached answer for a similar query, or None on a miss
+
+        A stale entry is still returned; when refresh is given it recomputes
+        the entry in the background.
+        """
+        vector = self._embed(query)
+        if vector is None:
+            return None
+
+        entities = price_entities(query)
+        with self._lock:
+            self._reset_if_scope_changed(scope)
+            entry = self._best_match(vector, entities)
+            if entry is not None:
+                age = time.monotonic() - entry["created"]
+                if age < self.ttl_seconds:
+                    self.hits += 1
+                    return entry["result"]
+                if age < self.ttl_seconds + self.stale_ttl_seconds:
+                    self.stale_hits += 1
+                    if refresh is not None and not entry["refreshing"]:
+                        entry["refreshing"] = True
+                        self._executor.submit(self._refresh, entry, scope, refresh, cacheable)
+                    return entry["result"]
+            self.misses += 1
+        return None
+
+    def put(self, query: str, scope: str, result: dict,
+            cacheable: Callable[[dict], bool] = lambda result: True) -> None:
+        """Store a computed answer (the query embedding comes from the embedder's LRU)"""
+        if not cacheable(result):
+            return
+        vector = self._embed(query)
+        if vector is None:
+            return
+        entities = price_entities(query)
+        with self._lock:
+            if self._scope == scope:
+                # Reuse an expired (or concurrently stored) match instead of adding a near-duplicate
+                entry = self._best_match(vector, entities)
+                if entry is None:
+                    self._store(query, vector, entities, result)
+                else:
+                    entry["result"] = result
+                    entry["created"] = time.monotonic()
+
+    def get_or_compute(self, query: str, scope: str, compute: Callable[[], dict],
+                       cacheable: Callable[[dict], bool] = lambda result: True,
+                       refresh: Optional[Callable[[], dict]] = None) -> dict:
+        """
+        Return a cached answer for a similar query, or compute and store a new one
+
+        Args:
+            query: The normalized user query
+            scope: Cache scope from scope_for()
+            compute: Produces the answer payload on a miss or background refresh
+            cacheable: Decides whether a computed payload may be stored
+            refresh: Produces the answer on a background refresh (defaults to compute)
+        """
+        result = self.get(query, scope, refresh=refresh or compute, cacheable=cacheable)
+        if result is not None:
+            return result
+        result = compute()
+        self.put(query, scope, result, cacheable)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses
+            }
+
+
+def create_answer_cache(embed_fn: Callable[[str], List[float]]) -> Optional[SemanticAnswerCache]:
+    """Build the answer cache from ANSWER_CACHE_CONFIG, or None when disabled"""
+    if not ANSWER_CACHE_CONFIG['ENABLED']:
+        return None
+    return SemanticAnswerCache(
+        embed_fn,
+        similarity_threshold=ANSWER_CACHE_CONFIG['SIMILARITY_THRESHOLD'],
+        max_entries=ANSWER_CACHE_CONFIG['MAX_ENTRIES'],
+        ttl_seconds=ANSWER_CACHE_CONFIG['TTL_SECONDS'],
+        stale_ttl_seconds=ANSWER_CACHE_CONFIG['STALE_TTL_SECONDS']
+    )
@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Dict, List, Union
 from app.config.settings import DB_PATH, AVAILABLE_SLOTS
 from app.services.email_service import EmailService
+from app.utils.database.db_utils import connect
 import requests
 
 # Set up logging
@@ -22,7 +23,7 @@ class AppointmentService:
     def get_db_connection(self) -> sqlite3.Connection:
         """Get a database connection"""
         try:
-            return sqlite3.connect(self.db_path)
+            return connect(self.db_path)
         except sqlite3.Error as e:
             logger.error(f"Database connection error: {str(e)}")
             raise
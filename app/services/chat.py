@@ -1,73 +1,87 @@
-from openai import OpenAI
 import logging
 import os
 import json
-from app.config.settings import MODEL_CONFIG, SYSTEM_PROMPT, PRICES_CSV_PATH
+import time
+from typing import AsyncIterator, Iterator, Optional, Tuple
+from app.config.settings import MODEL_CONFIG, PIPELINE_CONFIG, PRICE_TABLE_CONFIG
 from app.services.vector_store import VectorStoreService
-from app.services.intent_detection import IntentDetectionService
-import pandas as pd
+from app.services.intent_detection import IntentDetectionService, APPOINTMENT_INTENTS
+from app.services.prompt_builder import PromptBuilder
+from app.services.price_table import get_price_table
+from app.services.response_cache import ResponseCache, create_response_cache
+from app.models.request_context import RequestContext
+from app.utils.executor import get_executor
+from app.utils.openai_client import get_client, get_async_client, timeout_for
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+ERROR_RESPONSE = "I apologize, but I encountered an error processing your request. Please try again."
+
+# Single-call mode: the model classifies the intent and answers in one JSON response
+STRUCTURED_INTENTS = ["schedule_appointment", "cancel_appointment", "check_status", "price_query", "general_query"]
+
+STRUCTURED_INSTRUCTIONS = """
+Besides answering, classify the user's intent as one of:
+- "schedule_appointment": the user wants to book, schedule or sign up for a class or consultation
+- "cancel_appointment": the user wants to cancel an existing appointment
+- "check_status": the user wants to look up their existing appointments
+- "price_query": the user is asking about costs, fees or discounts
+- "general_query": any other request
+Give your confidence in the intent between 0 and 1. For the three appointment intents the
+booking form is shown instead of your answer, so keep the answer to one short sentence.
+"""
+
+STRUCTURED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "intent_and_answer",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string", "enum": STRUCTURED_INTENTS},
+                "confidence": {"type": "number"},
+                "answer": {"type": "string"}
+            },
+            "required": ["intent", "confidence", "answer"],
+            "additionalProperties": False
+        }
+    }
+}
+
 class ChatService:
     def __init__(self):
-        self.client = OpenAI()
+        self.client = get_client()
+        self.async_client = get_async_client()
         self.model = MODEL_CONFIG['MODEL_NAME']
         self.vector_store = VectorStoreService()
         self.intent_detector = IntentDetectionService()
-        self.prices_path = PRICES_CSV_PATH
+        self.prompt_builder = PromptBuilder()
+        self.response_cache = create_response_cache(lambda: self.vector_store.knowledge_version)
+        self.price_table = get_price_table()
         self.confidence_threshold_high = 0.7
         self.confidence_threshold_medium = 0.4
         logger.info("Chat service initialized")
 
     def load_price_data(self) -> str:
-        """Load and format price data from CSV"""
-        try:
-            logger.info(f"Loading price data from: {self.prices_path}")
-            df = pd.read_csv(self.prices_path)
-            price_info = "Here are our course prices:\n\n"
-            for _, row in df.iterrows():
-                price_info += (f"{row['Course Name']} - {row['Course Level']}\n"
-                             f"Duration: {row['Hours']} hours\n"
-                             f"Price: ${row['Price (USD)']}\n\n")
-            logger.info(f"Successfully loaded {len(df)} price entries")
-            return price_info
-        except Exception as e:
-            logger.error(f"Error loading price data: {str(e)}")
-            return ""
-            
-    def verify_intent_with_llm(self, user_query: str, initial_intent: dict, conversation_history: list = None) -> dict:
-        """
-        Use the main LLM to verify and potentially correct the intent when confidence is medium
-        
-        Args:
-            user_query: The user's input
-            initial_intent: The intent detected by the intent detection service
-            conversation_history: Optional list of previous messages
+        """Full price table text (parsed once, reloaded when prices.csv changes)"""
+        return self.price_table.full_text()
             
-        Returns:
-            Updated intent dictionary with potentially improved classification
-        """
-        try:
-            # Only use this for medium confidence results
-            confidence = initial_intent.get("confidence", 0)
-            if confidence >= self.confidence_threshold_high or confidence < self.confidence_threshold_medium:
-                return initial_intent
+    def _verification_messages(self, user_query: str, initial_intent: dict, conversation_history: list = None) -> list:
+        """Build the intent verification prompt"""
+        confidence = initial_intent.get("confidence", 0)
+        # Format conversation history
+        history_context = ""
+        if conversation_history and len(conversation_history) > 0:
+            history_context = "Previous conversation:\n"
+            for i, msg in enumerate(conversation_history[-3:]):  # Include up to 3 most recent messages
+                role = "User" if msg["role"] == "user" else "Assistant"
+                history_context += f"{role}: {msg['content']}\n"
                 
-            logger.info(f"Verifying medium-confidence intent with LLM: {initial_intent.get('intent')} ({confidence:.2f})")
-            
-            # Format conversation history
-            history_context = ""
-            if conversation_history and len(conversation_history) > 0:
-                history_context = "Previous conversation:\n"
-                for i, msg in enumerate(conversation_history[-3:]):  # Include up to 3 most recent messages
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    history_context += f"{role}: {msg['content']}\n"
-                    
-            # Create a prompt for the LLM to verify the intent
-            messages = [
-                {"role": "system", "content": """You are an intent verification system. 
+        # Create a prompt for the LLM to verify the intent
+        return [
+            {"role": "system", "content": """You are an intent verification system. 
                 Your job is to analyze the user's query in context and determine if the initial intent classification is correct.
                 
                 Available intents are:
@@ -77,7 +91,7 @@ class ChatService:
                 
                 Consider the conversation history and the exact wording of the query. Be more sensitive to appointment-related and price-related queries as these have special handling.
                 """},
-                {"role": "user", "content": f"""
+            {"role": "user", "content": f"""
                 Initial intent classification: {initial_intent.get('intent')}
                 Initial confidence: {confidence}
                 
@@ -91,14 +105,41 @@ class ChatService:
                 - "confidence": a number between 0 and 1
                 - "explanation": a brief explanation of why you classified it this way
                 """}
-            ]
+        ]
+
+    def verify_intent_with_llm(self, user_query: str, initial_intent: dict, conversation_history: list = None,
+                               ctx: RequestContext = None) -> dict:
+        """
+        Use the main LLM to verify and potentially correct the intent when confidence is medium
+        
+        Args:
+            user_query: The user's input
+            initial_intent: The intent detected by the intent detection service
+            conversation_history: Optional list of previous messages
+            ctx: Optional request context that records token usage
+            
+        Returns:
+            Updated intent dictionary with potentially improved classification
+        """
+        try:
+            # Only use this for medium confidence results
+            confidence = initial_intent.get("confidence", 0)
+            if confidence >= self.confidence_threshold_high or confidence < self.confidence_threshold_medium:
+                return initial_intent
+                
+            logger.info(f"Verifying medium-confidence intent with LLM: {initial_intent.get('intent')} ({confidence:.2f})")
+            
+            messages = self._verification_messages(user_query, initial_intent, conversation_history)
             
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.3,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                timeout=timeout_for("intent_verification")
             )
+            if ctx is not None:
+                ctx.add_usage("intent_verification", response.usage)
             
             # Parse the JSON response
             try:
@@ -113,19 +154,42 @@ class ChatService:
             logger.error(f"Error in intent verification: {str(e)}")
             return initial_intent  # Fall back to the original intent
 
-    def get_hybrid_intent(self, user_query: str, conversation_history: list = None) -> dict:
+    def get_hybrid_intent(self, user_query: str, conversation_history: list = None,
+                          ctx: RequestContext = None) -> dict:
         """
         Get intent using a hybrid approach combining dedicated intent detection and LLM verification
         
         Args:
             user_query: The user's input
             conversation_history: Optional list of previous messages
+            ctx: Optional request context; an intent already stored there is reused
             
         Returns:
             Intent dictionary with the most accurate classification
         """
-        # First use the dedicated intent detection service
-        initial_intent = self.intent_detector.detect_intent(user_query)
+        if ctx is None:
+            ctx = RequestContext(query=user_query, conversation_history=conversation_history or [])
+        if ctx.intent is not None:
+            return ctx.intent
+
+        with ctx.stage("intent"):
+            ctx.intent = self._classify_intent(user_query, conversation_history, ctx)
+        return ctx.intent
+
+    def start_retrieval(self, ctx: RequestContext) -> None:
+        """Retrieve context in the background while the rest of the pipeline runs"""
+        if PIPELINE_CONFIG['CONCURRENT']:
+            self.vector_store.prefetch(ctx.query, ctx, get_executor())
+
+    def _classify_intent(self, user_query: str, conversation_history: list, ctx: RequestContext) -> dict:
+        # Rules settle obvious messages instantly; appointment intents need no retrieval
+        rule_intent = self.intent_detector.match_rules(user_query)
+        if rule_intent is not None:
+            return rule_intent
+
+        # Model-based detection takes an embedding or LLM round-trip, so retrieve meanwhile
+        self.start_retrieval(ctx)
+        initial_intent = self.intent_detector.detect_intent_model(user_query, ctx)
         confidence = initial_intent.get("confidence", 0)
         
         logger.info(f"Initial intent detection: {initial_intent.get('intent')} with confidence {confidence}")
@@ -136,42 +200,386 @@ class ChatService:
             
         # For medium confidence, verify with LLM
         if confidence >= self.confidence_threshold_medium:
-            return self.verify_intent_with_llm(user_query, initial_intent, conversation_history)
+            with ctx.stage("intent_verification"):
+                return self.verify_intent_with_llm(user_query, initial_intent, conversation_history, ctx)
             
         # For low confidence, it's already a general query
         return initial_intent
 
-    def get_completion(self, user_input: str, conversation_history: list = None) -> str:
-        """Get a completion for the user's input"""
+    def _price_info_for(self, user_input: str, intent_data: dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Price context for price-related intents
+
+        Returns:
+            (full table for the system message, rows matching the question),
+            at most one of them set; (None, None) for other intents
+        """
+        if intent_data.get("intent") != "price_query" or intent_data.get("confidence", 0) <= self.confidence_threshold_medium:
+            return None, None
+        if PRICE_TABLE_CONFIG['FILTER_ROWS']:
+            relevant = self.price_table.text_for(user_input)
+            if relevant is not None:
+                return None, relevant
+        return self.load_price_data(), None
+
+    def _build_messages(self, user_input: str, conversation_history: list, ctx: RequestContext) -> list:
+        """Resolve the intent, gather context and return the chat messages for the answer call"""
+        # Get intent using hybrid approach (computed once per request)
+        intent_data = self.get_hybrid_intent(user_input, conversation_history, ctx)
+        logger.info(f"Final intent: {intent_data.get('intent')} with confidence: {intent_data.get('confidence', 0)}")
+        
+        # Load price information for price-related queries while retrieval may still be running
+        with ctx.stage("price_data"):
+            price_info, relevant_prices = self._price_info_for(user_input, intent_data)
+        
+        # Get context from vector store (waits for a prefetched retrieval)
+        context = self.vector_store.get_context(user_input, ctx)
+        return self.prompt_builder.messages(user_input, context, conversation_history, price_info,
+                                            relevant_prices=relevant_prices)
+
+    def get_completion(self, user_input: str, conversation_history: list = None,
+                       ctx: RequestContext = None) -> str:
+        """
+        Get a completion for the user's input
+
+        Identical questions in the same conversation context are answered from
+        the response cache; concurrent identical requests share one generation.
+
+        Args:
+            user_input: The user's input
+            conversation_history: Optional list of previous messages
+            ctx: Optional request context; intent and retrieved chunks already
+                computed for this request are reused rather than recomputed
+        """
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        if self.response_cache is None:
+            return self._generate_completion(user_input, conversation_history, ctx)
+        key = ResponseCache.key_for(user_input, conversation_history)
+        return self.response_cache.get_or_compute(
+            key,
+            lambda: self._generate_completion(user_input, conversation_history, ctx),
+            cacheable=lambda answer: answer != ERROR_RESPONSE
+        )
+
+    def _generate_completion(self, user_input: str, conversation_history: list, ctx: RequestContext) -> str:
         try:
-            # Get intent using hybrid approach
-            intent_data = self.get_hybrid_intent(user_input, conversation_history)
-            logger.info(f"Final intent: {intent_data.get('intent')} with confidence: {intent_data.get('confidence', 0)}")
-            
-            # Get context from vector store
-            context = self.vector_store.query(user_input, conversation_history)
+            messages = self._build_messages(user_input, conversation_history, ctx)
             
-            # Add price information for price-related queries
-            if intent_data.get("intent") == "price_query" and intent_data.get("confidence", 0) > self.confidence_threshold_medium:
-                logger.info("Appending price information to context")
-                price_info = self.load_price_data()
-                context = f"{context}\n\nAdditional pricing information:\n{price_info}"
+            logger.info(f"Sending request to OpenAI with model: {self.model}")
+            with ctx.stage("generation"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    timeout=timeout_for("generation")
+                )
+            ctx.add_usage("generation", response.usage)
             
-            # Get completion from OpenAI
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": context}
-            ]
+            return response.choices[0].message.content
             
-            logger.info(f"Sending request to OpenAI with model: {self.model}")
-            response = self.client.chat.completions.create(
+        except Exception as e:
+            logger.error(f"Error in get_completion: {str(e)}")
+            return ERROR_RESPONSE
+
+    def stream_completion(self, user_input: str, conversation_history: list = None,
+                          ctx: RequestContext = None) -> Iterator[str]:
+        """
+        Stream the answer for the user's input as text deltas
+
+        Same pipeline as get_completion, but the answer call uses stream=True
+        so callers can forward tokens as they arrive. On error the remaining
+        output is ERROR_RESPONSE.
+        """
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        key = generation = None
+        if self.response_cache is not None:
+            key = ResponseCache.key_for(user_input, conversation_history)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+            # An answer streamed while the answer sources change must not be stored
+            generation = self.response_cache.generation()
+        try:
+            messages = self._build_messages(user_input, conversation_history, ctx)
+
+            logger.info(f"Streaming request to OpenAI with model: {self.model}")
+            start = time.perf_counter()
+            parts = []
+            stream = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=0.7
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout_for("generation")
             )
-            
+            first_token = True
+            for chunk in stream:
+                if chunk.usage is not None:
+                    ctx.add_usage("generation", chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token:
+                        ctx.timings["first_token"] = (time.perf_counter() - start) * 1000
+                        first_token = False
+                    parts.append(delta)
+                    yield delta
+            ctx.timings["generation"] = (time.perf_counter() - start) * 1000
+            if key is not None and parts:
+                self.response_cache.put(key, "".join(parts), generation=generation)
+
+        except Exception as e:
+            logger.error(f"Error in stream_completion: {str(e)}")
+            yield ERROR_RESPONSE
+
+    def _structured_messages(self, user_input: str, context: str, conversation_history: list = None) -> list:
+        """Messages for the single structured call; the price table is always included"""
+        return self.prompt_builder.messages(user_input, context, conversation_history,
+                                            price_info=self.load_price_data(), instructions=STRUCTURED_INSTRUCTIONS)
+
+    def _structured_result(self, response, rule_intent: dict, ctx: RequestContext) -> dict:
+        """Parse the structured response and record the intent on ctx"""
+        result = json.loads(response.choices[0].message.content)
+        if rule_intent is not None:
+            # A rule match (price wording) outranks the model's own label
+            result["intent"], result["confidence"] = rule_intent["intent"], rule_intent["confidence"]
+            ctx.intent = rule_intent
+        else:
+            ctx.intent = {
+                "intent": result["intent"],
+                "confidence": result["confidence"],
+                "explanation": "Classified together with the answer"
+            }
+        logger.info(f"Structured intent: {result['intent']} with confidence {result['confidence']}")
+        return result
+
+    def get_structured_completion(self, user_input: str, conversation_history: list = None,
+                                  ctx: RequestContext = None) -> dict:
+        """
+        Classify the intent and answer with a single model call (GENERATION_MODE 'structured')
+
+        Appointment messages settled by the intent rules need no model call at
+        all. Otherwise the retrieved context and the price table are sent with a JSON schema
+        asking for intent, confidence and answer together.
+
+        Args:
+            user_input: The user's input
+            conversation_history: Optional list of previous messages
+            ctx: Optional request context; receives the intent, chunks and token usage
+
+        Returns:
+            Dictionary with "intent", "confidence" and "answer" (None for rule-settled intents)
+        """
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        try:
+            with ctx.stage("intent"):
+                rule_intent = self.intent_detector.match_rules(user_input)
+            if rule_intent is not None and rule_intent["intent"] in APPOINTMENT_INTENTS:
+                ctx.intent = rule_intent
+                return {"intent": rule_intent["intent"], "confidence": rule_intent["confidence"], "answer": None}
+
+            context = self.vector_store.get_context(user_input, ctx)
+            with ctx.stage("price_data"):
+                messages = self._structured_messages(user_input, context, conversation_history)
+
+            logger.info(f"Sending structured request to OpenAI with model: {self.model}")
+            with ctx.stage("generation"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    response_format=STRUCTURED_RESPONSE_FORMAT,
+                    timeout=timeout_for("generation")
+                )
+            ctx.add_usage("generation", response.usage)
+            return self._structured_result(response, rule_intent, ctx)
+
+        except Exception as e:
+            logger.error(f"Error in get_structured_completion: {str(e)}")
+            ctx.intent = {"intent": "general_query", "confidence": 0.0, "explanation": "Error in structured generation"}
+            return {"intent": "general_query", "confidence": 0.0, "answer": ERROR_RESPONSE}
+
+    # Async variants used by the ASGI entry point (asgi.py). They share prompts and
+    # parsing with the methods above but await AsyncOpenAI instead of blocking a thread.
+
+    async def averify_intent_with_llm(self, user_query: str, initial_intent: dict, conversation_history: list = None,
+                                      ctx: RequestContext = None) -> dict:
+        """Async variant of verify_intent_with_llm"""
+        try:
+            confidence = initial_intent.get("confidence", 0)
+            if confidence >= self.confidence_threshold_high or confidence < self.confidence_threshold_medium:
+                return initial_intent
+
+            logger.info(f"Verifying medium-confidence intent with LLM: {initial_intent.get('intent')} ({confidence:.2f})")
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._verification_messages(user_query, initial_intent, conversation_history),
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                timeout=timeout_for("intent_verification")
+            )
+            if ctx is not None:
+                ctx.add_usage("intent_verification", response.usage)
+            llm_intent = json.loads(response.choices[0].message.content)
+            logger.info(f"LLM verified intent: {llm_intent.get('intent')} with confidence {llm_intent.get('confidence')}")
+            return llm_intent
+
+        except Exception as e:
+            logger.error(f"Error in intent verification: {str(e)}")
+            return initial_intent
+
+    async def aget_hybrid_intent(self, user_query: str, conversation_history: list = None,
+                                 ctx: RequestContext = None) -> dict:
+        """Async variant of get_hybrid_intent"""
+        if ctx is None:
+            ctx = RequestContext(query=user_query, conversation_history=conversation_history or [])
+        if ctx.intent is not None:
+            return ctx.intent
+
+        with ctx.stage("intent"):
+            rule_intent = self.intent_detector.match_rules(user_query)
+            if rule_intent is not None:
+                ctx.intent = rule_intent
+                return ctx.intent
+
+            self.start_retrieval(ctx)
+            initial_intent = await self.intent_detector.adetect_intent_model(user_query, ctx)
+            confidence = initial_intent.get("confidence", 0)
+            logger.info(f"Initial intent detection: {initial_intent.get('intent')} with confidence {confidence}")
+            if self.confidence_threshold_medium <= confidence < self.confidence_threshold_high:
+                with ctx.stage("intent_verification"):
+                    initial_intent = await self.averify_intent_with_llm(
+                        user_query, initial_intent, conversation_history, ctx
+                    )
+            ctx.intent = initial_intent
+        return ctx.intent
+
+    async def _abuild_messages(self, user_input: str, conversation_history: list, ctx: RequestContext) -> list:
+        intent_data = await self.aget_hybrid_intent(user_input, conversation_history, ctx)
+        logger.info(f"Final intent: {intent_data.get('intent')} with confidence: {intent_data.get('confidence', 0)}")
+        with ctx.stage("price_data"):
+            price_info, relevant_prices = self._price_info_for(user_input, intent_data)
+        context = await self.vector_store.aget_context(user_input, ctx)
+        return self.prompt_builder.messages(user_input, context, conversation_history, price_info,
+                                            relevant_prices=relevant_prices)
+
+    async def aget_completion(self, user_input: str, conversation_history: list = None,
+                              ctx: RequestContext = None) -> str:
+        """Async variant of get_completion"""
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        if self.response_cache is None:
+            return await self._agenerate_completion(user_input, conversation_history, ctx)
+        key = ResponseCache.key_for(user_input, conversation_history)
+        return await self.response_cache.aget_or_compute(
+            key,
+            lambda: self._agenerate_completion(user_input, conversation_history, ctx),
+            cacheable=lambda answer: answer != ERROR_RESPONSE
+        )
+
+    async def _agenerate_completion(self, user_input: str, conversation_history: list, ctx: RequestContext) -> str:
+        try:
+            messages = await self._abuild_messages(user_input, conversation_history, ctx)
+
+            logger.info(f"Sending request to OpenAI with model: {self.model}")
+            with ctx.stage("generation"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    timeout=timeout_for("generation")
+                )
+            ctx.add_usage("generation", response.usage)
             return response.choices[0].message.content
-            
+
         except Exception as e:
-            logger.error(f"Error in get_completion: {str(e)}")
-            return "I apologize, but I encountered an error processing your request. Please try again." 
\ No newline at end of file
+            logger.error(f"Error in aget_completion: {str(e)}")
+            return ERROR_RESPONSE
+
+    async def astream_completion(self, user_input: str, conversation_history: list = None,
+                                 ctx: RequestContext = None) -> AsyncIterator[str]:
+        """Async variant of stream_completion"""
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        key = generation = None
+        if self.response_cache is not None:
+            key = ResponseCache.key_for(user_input, conversation_history)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+            # An answer streamed while the answer sources change must not be stored
+            generation = self.response_cache.generation()
+        try:
+            messages = await self._abuild_messages(user_input, conversation_history, ctx)
+
+            logger.info(f"Streaming request to OpenAI with model: {self.model}")
+            start = time.perf_counter()
+            parts = []
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout_for("generation")
+            )
+            first_token = True
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    ctx.add_usage("generation", chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token:
+                        ctx.timings["first_token"] = (time.perf_counter() - start) * 1000
+                        first_token = False
+                    parts.append(delta)
+                    yield delta
+            ctx.timings["generation"] = (time.perf_counter() - start) * 1000
+            if key is not None and parts:
+                self.response_cache.put(key, "".join(parts), generation=generation)
+
+        except Exception as e:
+            logger.error(f"Error in astream_completion: {str(e)}")
+            yield ERROR_RESPONSE
+
+    async def aget_structured_completion(self, user_input: str, conversation_history: list = None,
+                                         ctx: RequestContext = None) -> dict:
+        """Async variant of get_structured_completion"""
+        if ctx is None:
+            ctx = RequestContext(query=user_input, conversation_history=conversation_history or [])
+        try:
+            with ctx.stage("intent"):
+                rule_intent = self.intent_detector.match_rules(user_input)
+            if rule_intent is not None and rule_intent["intent"] in APPOINTMENT_INTENTS:
+                ctx.intent = rule_intent
+                return {"intent": rule_intent["intent"], "confidence": rule_intent["confidence"], "answer": None}
+
+            context = await self.vector_store.aget_context(user_input, ctx)
+            with ctx.stage("price_data"):
+                messages = self._structured_messages(user_input, context, conversation_history)
+
+            logger.info(f"Sending structured request to OpenAI with model: {self.model}")
+            with ctx.stage("generation"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    response_format=STRUCTURED_RESPONSE_FORMAT,
+                    timeout=timeout_for("generation")
+                )
+            ctx.add_usage("generation", response.usage)
+            return self._structured_result(response, rule_intent, ctx)
+
+        except Exception as e:
+            logger.error(f"Error in aget_structured_completion: {str(e)}")
+            ctx.intent = {"intent": "general_query", "confidence": 0.0, "explanation": "Error in structured generation"}
+            return {"intent": "general_query", "confidence": 0.0, "answer": ERROR_RESPONSE}
@@ -0,0 +1,127 @@
+"""
+Rolling summaries of long conversations.
+
+Once the turns after a session's summary pass SUMMARY_CONFIG['TRIGGER_TOKENS'],
+the older ones are folded into the summary by one model call, on a
+background thread after the response has been sent, so the current turn
+never waits for it. Later prompts then carry the summary plus the newest
+turns instead of the full history; the tokens this saves are kept per
+session (SessionStore.stats) and exported at /metrics.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from app.config.settings import MODEL_CONFIG, SUMMARY_CONFIG
+from app.models.request_context import RequestContext
+from app.services.session_store import SessionStore
+from app.utils import metrics
+from app.utils.openai_client import get_client, timeout_for
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a conversation between a parent or student and an education center's assistant.
+Fold the new turns into the existing summary. Keep the facts needed to continue the conversation: the student's grade, subjects, courses, formats and prices discussed, dates, names, and open questions.
+Drop greetings and repetition. Write in the language(s) the user writes in. Reply with the updated summary only."""
+
+
+class ConversationSummarizer:
+    """Folds older session turns into a running summary on background threads"""
+
+    def __init__(self, session_store: SessionStore, trigger_tokens: int, keep_recent_tokens: int,
+                 max_summary_tokens: int, workers: int):
+        self.session_store = session_store
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.client = get_client()
+        self.model = MODEL_CONFIG['MODEL_NAME']
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="conversation-summary")
+        self._lock = threading.Lock()
+        self._running = set()
+
+    def schedule(self, session_id: str) -> Optional[Future]:
+        """Summarize the session in the background if it is due (at most one run per session at a time)"""
+        with self._lock:
+            if session_id in self._running:
+                return None
+            self._running.add(session_id)
+        try:
+            return self._executor.submit(self._run, session_id)
+        except RuntimeError:
+            # Executor shut down at interpreter exit
+            with self._lock:
+                self._running.discard(session_id)
+            return None
+
+    def _run(self, session_id: str) -> Optional[int]:
+        try:
+            return self.summarize(session_id)
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
+
+    @staticmethod
+    def _summary_messages(previous: str, turns: List[dict]) -> List[dict]:
+        transcript = "\n".join(
+            f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}" for turn in turns
+        )
+        return [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"}
+        ]
+
+    def summarize(self, session_id: str) -> Optional[int]:
+        """
+        Fold the session's older turns into its summary if the history has passed the threshold
+
+        Returns:
+            Tokens saved per prompt after the new summary, or None when nothing was summarized
+        """
+        try:
+            pending = self.session_store.pending_summary(session_id, self.trigger_tokens, self.keep_recent_tokens)
+            if pending is None:
+                return None
+
+            ctx = RequestContext(query="")
+            with ctx.stage("summary"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._summary_messages(pending["summary"], pending["turns"]),
+                    temperature=0.2,
+                    max_tokens=self.max_summary_tokens,
+                    timeout=timeout_for("summary")
+                )
+            ctx.add_usage("summary", response.usage)
+            metrics.record_request(ctx)
+
+            text = (response.choices[0].message.content or "").strip()
+            if not text:
+                metrics.SESSION_SUMMARIES.labels("empty").inc()
+                return None
+            tokens_saved = self.session_store.save_summary(session_id, text, pending["covered_turns"])
+            metrics.SESSION_SUMMARIES.labels("ok").inc()
+            metrics.SESSION_TOKENS_SAVED.labels().observe(tokens_saved)
+            logger.info(f"Session {session_id}: summarized {pending['covered_turns']} turns, "
+                        f"{tokens_saved} tokens saved per prompt")
+            return tokens_saved
+        except Exception as e:
+            metrics.SESSION_SUMMARIES.labels("error").inc()
+            logger.error(f"Error summarizing session {session_id}: {str(e)}")
+            return None
+
+
+def create_conversation_summarizer(session_store: Optional[SessionStore]) -> Optional[ConversationSummarizer]:
+    """Build the summarizer from SUMMARY_CONFIG, or None when disabled or without a session store"""
+    if session_store is None or not SUMMARY_CONFIG['ENABLED']:
+        return None
+    return ConversationSummarizer(
+        session_store,
+        trigger_tokens=SUMMARY_CONFIG['TRIGGER_TOKENS'],
+        keep_recent_tokens=SUMMARY_CONFIG['KEEP_RECENT_TOKENS'],
+        max_summary_tokens=SUMMARY_CONFIG['MAX_SUMMARY_TOKENS'],
+        workers=SUMMARY_CONFIG['WORKERS']
+    )
@@ -4,8 +4,10 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import os
 import logging
+import time
 from typing import Dict, Optional, Union, Tuple
 from app.config.settings import SMTP_CONFIG
+from app.utils.metrics import SMTP_SEND_SECONDS
 
 # Set up logging
 logging.basicConfig(
@@ -185,6 +187,8 @@ class EmailService:
         msg["Subject"] = subject
         msg.attach(MIMEText(body, "html"))
 
+        start = time.perf_counter()
+        outcome = "error"
         try:
             with smtplib.SMTP(self.config["server"], self.config["port"]) as server:
                 logger.debug("Connected to SMTP server")
@@ -194,6 +198,7 @@ class EmailService:
                 logger.debug("Logged in successfully")
                 server.send_message(msg)
                 logger.info("Email sent successfully")
+                outcome = "sent"
                 return True, None
         except smtplib.SMTPAuthenticationError:
             error_msg = "Failed to authenticate with email server"
@@ -207,6 +212,8 @@ class EmailService:
             error_msg = f"Error sending email: {str(e)}"
             logger.error(error_msg)
             return False, error_msg
+        finally:
+            SMTP_SEND_SECONDS.labels(outcome).observe(time.perf_counter() - start)
 
     def send_appointment_notifications(self, appointment_data: Dict, template_type: str) -> Tuple[bool, Optional[str]]:
         """
@@ -0,0 +1,274 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import closing
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """Content hash used as the cache key for a chunk of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (embedding model, text hash)
+
+    Vectors are appended to one float32 matrix file per model and read back
+    through a memory map. A SQLite table maps each key to its row in the
+    matrix. Appends happen inside an IMMEDIATE transaction, so several worker
+    processes can share the same cache directory safely.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "embeddings.sqlite")
+        model_key = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16]
+        self.matrix_path = os.path.join(cache_dir, f"{model_key}.f32")
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._dim = None
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+
+    def _init_db(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_models (
+                    model TEXT PRIMARY KEY,
+                    dim INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            row = conn.execute(
+                "SELECT dim FROM embedding_models WHERE model = ?", (self.model_name,)
+            ).fetchone()
+            self._dim = row[0] if row else None
+
+    def _rows(self, needed_row: int) -> Optional[np.ndarray]:
+        """Return a memory map of the matrix that covers needed_row"""
+        if self._dim is None:
+            return None
+        if self._matrix is None or needed_row >= self._matrix.shape[0]:
+            n_rows = os.path.getsize(self.matrix_path) // (self._dim * 4)
+            if n_rows == 0:
+                return None
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r",
+                                     shape=(n_rows, self._dim))
+        return self._matrix
+
+    def _select_rows(self, conn: sqlite3.Connection, hashes: List[str]) -> List[tuple]:
+        """Return (text_hash, row) pairs for the hashes present in the cache"""
+        rows = []
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(conn.execute(
+                f"SELECT text_hash, row FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({placeholders})",
+                (self.model_name, *batch)
+            ).fetchall())
+        return rows
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors, returning only the hashes that were found"""
+        found = {}
+        if not hashes:
+            return found
+        unique = list(dict.fromkeys(hashes))
+        with closing(self._connect()) as conn:
+            if self._dim is None:
+                row = conn.execute(
+                    "SELECT dim FROM embedding_models WHERE model = ?", (self.model_name,)
+                ).fetchone()
+                self._dim = row[0] if row else None
+                if self._dim is None:
+                    return found
+            rows = self._select_rows(conn, unique)
+
+        if not rows:
+            return found
+        with self._lock:
+            matrix = self._rows(max(row for _, row in rows))
+            if matrix is None:
+                return found
+            for key, row in rows:
+                if row < matrix.shape[0]:
+                    found[key] = matrix[row].tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Append new vectors to the matrix and register their keys"""
+        if not items:
+            return
+        dim = len(next(iter(items.values())))
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT dim FROM embedding_models WHERE model = ?", (self.model_name,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("INSERT INTO embedding_models (model, dim) VALUES (?, ?)",
+                                 (self.model_name, dim))
+                elif row[0] != dim:
+                    raise ValueError(f"Embedding dimension changed from {row[0]} to {dim}")
+
+                # Another worker may have stored some of these in the meantime
+                existing = {key for key, _ in self._select_rows(conn, list(items))}
+                new_items = [(key, vector) for key, vector in items.items() if key not in existing]
+                if new_items:
+                    with open(self.matrix_path, "ab") as f:
+                        start_row = f.tell() // (dim * 4)
+                        matrix = np.asarray([vector for _, vector in new_items], dtype=np.float32)
+                        f.write(matrix.tobytes())
+                    conn.executemany(
+                        "INSERT INTO embeddings (model, text_hash, row) VALUES (?, ?, ?)",
+                        [(self.model_name, key, start_row + i) for i, (key, _) in enumerate(new_items)]
+                    )
+                conn.execute("COMMIT")
+                self._dim = dim
+                logger.info(f"Stored {len(new_items)} new embeddings in cache")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that reads chunk embeddings through an EmbeddingCache
+
+    Only texts missing from the cache are sent to the wrapped model. Query
+    embeddings are kept in a small in-memory LRU instead of on disk, and
+    concurrent requests for the same query (intent classification and
+    retrieval running side by side) share a single model call.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _query_cache: OrderedDict = PrivateAttr()
+    _query_cache_size: int = PrivateAttr()
+    _query_lock: threading.Lock = PrivateAttr()
+    _query_inflight: Dict[str, Future] = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, query_cache_size: int = 1024, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+        self._cache = cache
+        self._query_cache = OrderedDict()
+        self._query_cache_size = query_cache_size
+        self._query_lock = threading.Lock()
+        self._query_inflight = {}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, texts: List[str]):
+        hashes = [text_hash(text) for text in texts]
+        cached = self._cache.get_many(hashes)
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached:
+                missing[key] = text
+        return hashes, cached, missing
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = self._lookup(texts)
+        if missing:
+            logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+            vectors = self._inner.get_text_embedding_batch(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._cache.put_many(new_items)
+            cached.update(new_items)
+        return [cached[key] for key in hashes]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = self._lookup(texts)
+        if missing:
+            vectors = await self._inner.aget_text_embedding_batch(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._cache.put_many(new_items)
+            cached.update(new_items)
+        return [cached[key] for key in hashes]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _cached_query(self, query: str) -> Optional[List[float]]:
+        with self._query_lock:
+            vector = self._query_cache.get(query)
+            if vector is not None:
+                self._query_cache.move_to_end(query)
+            return vector
+
+    def _store_query(self, query: str, vector: List[float]) -> None:
+        with self._query_lock:
+            self._query_cache[query] = vector
+            self._query_cache.move_to_end(query)
+            while len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        vector = self._cached_query(query)
+        if vector is not None:
+            return vector
+        with self._query_lock:
+            # Re-check: another thread may have finished embedding this query meanwhile
+            vector = self._query_cache.get(query)
+            if vector is not None:
+                return vector
+            future = self._query_inflight.get(query)
+            owner = future is None
+            if owner:
+                future = self._query_inflight[query] = Future()
+        if not owner:
+            return future.result()
+        try:
+            vector = self._inner.get_query_embedding(query)
+            self._store_query(query, vector)
+            future.set_result(vector)
+            return vector
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._query_lock:
+                self._query_inflight.pop(query, None)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        vector = self._cached_query(query)
+        if vector is None:
+            vector = await self._inner.aget_query_embedding(query)
+            self._store_query(query, vector)
+        return vector
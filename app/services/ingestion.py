@@ -0,0 +1,130 @@
+"""
+Knowledge-base ingestion driven by INGESTION_MANIFEST.
+
+Only files matched by a manifest entry are indexed, each with the loader the
+entry names. Everything else in DATA_DIR (appointments.db, journals, stray
+files) is ignored, so indexing cost depends only on knowledge content.
+"""
+
+import csv
+import fnmatch
+import logging
+import os
+import re
+from typing import Callable, Dict, List, Tuple
+
+from llama_index.core import Document
+
+from app.config.settings import DATA_DIR, INGESTION_MANIFEST
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+
+
+def load_markdown(path: str) -> List[Document]:
+    """Split a markdown file into one document per heading section"""
+    file_name = os.path.basename(path)
+    with open(path, "r", encoding="utf-8-sig") as f:
+        text = _COMMENT_RE.sub("", f.read().replace("\r\n", "\n"))
+
+    sections = []
+    headings = []
+    body = []
+    in_fence = False
+
+    def flush():
+        content = "\n".join(body).strip()
+        if content:
+            sections.append((" > ".join(title for _, title in headings), content))
+        body.clear()
+
+    for line in text.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            headings[:] = [(lvl, title) for lvl, title in headings if lvl < level]
+            headings.append((level, match.group(2).strip("* ")))
+        else:
+            body.append(line)
+    flush()
+
+    documents = []
+    for i, (section, content) in enumerate(sections):
+        documents.append(Document(
+            id_=f"{file_name}#{i}",
+            text=f"{section}\n{content}" if section else content,
+            metadata={"file_name": file_name, "section": section},
+            excluded_embed_metadata_keys=["file_name", "section"],
+            excluded_llm_metadata_keys=["file_name"]
+        ))
+    return documents
+
+
+def load_price_csv(path: str) -> List[Document]:
+    """Turn the price table into one structured document per course row"""
+    file_name = os.path.basename(path)
+    documents = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            course = row["Course Name"].strip()
+            level = row["Course Level"].strip()
+            text = (f"Course: {course}\n"
+                    f"Level: {level}\n"
+                    f"Duration: {row['Hours'].strip()} hours\n"
+                    f"Price: ${row['Price (USD)'].strip()} USD")
+            documents.append(Document(
+                id_=f"{file_name}#{i}",
+                text=text,
+                metadata={"file_name": file_name, "course": course, "level": level},
+                excluded_embed_metadata_keys=["file_name", "course", "level"],
+                excluded_llm_metadata_keys=["file_name"]
+            ))
+    return documents
+
+
+LOADERS: Dict[str, Callable[[str], List[Document]]] = {
+    "markdown": load_markdown,
+    "price_csv": load_price_csv,
+}
+
+
+def _loader_for(file_name: str):
+    for entry in INGESTION_MANIFEST['INCLUDE']:
+        if fnmatch.fnmatch(file_name, entry['pattern']):
+            return entry['loader']
+    return None
+
+
+def list_source_files(data_dir: str = DATA_DIR) -> List[Tuple[str, str]]:
+    """Return sorted (file name, loader name) pairs selected by the manifest"""
+    selected = []
+    for name in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        if any(fnmatch.fnmatch(name, pattern) for pattern in INGESTION_MANIFEST['EXCLUDE']):
+            continue
+        loader = _loader_for(name)
+        if loader is None:
+            logger.debug(f"Skipping {name}: not in the ingestion manifest")
+            continue
+        selected.append((name, loader))
+    return selected
+
+
+def load_documents(file_names: List[str], data_dir: str = DATA_DIR) -> Dict[str, List[Document]]:
+    """Load the given files with their manifest loaders, keyed by file name"""
+    documents_by_file = {}
+    for name in file_names:
+        loader = _loader_for(name)
+        if loader is None:
+            raise ValueError(f"No ingestion loader configured for {name}")
+        documents_by_file[name] = LOADERS[loader](os.path.join(data_dir, name))
+        logger.info(f"Loaded {len(documents_by_file[name])} documents from {name} ({loader})")
+    return documents_by_file
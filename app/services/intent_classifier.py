@@ -0,0 +1,90 @@
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import INTENT_CLASSIFIER_CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIntentClassifier:
+    """
+    Nearest-centroid intent classifier over embeddings of labeled exemplars
+
+    Each intent is represented by the normalized mean embedding of its
+    exemplars; classifying a query embedding is one (n_intents x dim) matmul.
+    The margin between the best and second-best cosine score tells the caller
+    whether the local answer is trustworthy or an LLM should decide.
+    """
+
+    def __init__(self, exemplars: Dict[str, List[str]],
+                 embed_texts: Callable[[List[str]], List[List[float]]],
+                 embed_query: Callable[[str], List[float]],
+                 temperature: float = 0.05,
+                 aembed_query: Optional[Callable[[str], Awaitable[List[float]]]] = None):
+        self.embed_query = embed_query
+        self.aembed_query = aembed_query
+        self.temperature = temperature
+        self.labels = sorted(exemplars)
+
+        texts = [text for label in self.labels for text in exemplars[label]]
+        start = time.perf_counter()
+        vectors = self._normalize(np.asarray(embed_texts(texts), dtype=np.float32))
+        centroids = []
+        offset = 0
+        for label in self.labels:
+            count = len(exemplars[label])
+            centroids.append(vectors[offset:offset + count].mean(axis=0))
+            offset += count
+        self.centroids = self._normalize(np.vstack(centroids))
+        logger.info(f"Intent classifier built from {len(texts)} exemplars in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    @classmethod
+    def from_config(cls, embed_model) -> Optional["EmbeddingIntentClassifier"]:
+        """Build the classifier from INTENT_CLASSIFIER_CONFIG, or None when disabled"""
+        if not INTENT_CLASSIFIER_CONFIG['ENABLED']:
+            return None
+        with open(INTENT_CLASSIFIER_CONFIG['EXEMPLARS_PATH'], "r", encoding="utf-8") as f:
+            exemplars = json.load(f)
+        return cls(
+            exemplars,
+            embed_texts=embed_model.get_text_embedding_batch,
+            embed_query=embed_model.get_query_embedding,
+            temperature=INTENT_CLASSIFIER_CONFIG['TEMPERATURE'],
+            aembed_query=embed_model.aget_query_embedding
+        )
+
+    def classify_vector(self, vector) -> dict:
+        """Classify an already-embedded query"""
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        scores = self.centroids @ query
+        order = np.argsort(-scores)
+        best = int(order[0])
+        margin = float(scores[best] - scores[order[1]]) if len(order) > 1 else 1.0
+        probs = np.exp((scores - scores[best]) / self.temperature)
+        probs /= probs.sum()
+        return {
+            "intent": self.labels[best],
+            "confidence": round(float(probs[best]), 4),
+            "margin": round(margin, 4),
+            "explanation": f"Nearest exemplar centroid (cosine {float(scores[best]):.3f}, margin {margin:.3f})"
+        }
+
+    def classify(self, text: str) -> dict:
+        """Embed and classify a query"""
+        return self.classify_vector(self.embed_query(text))
+
+    async def aclassify(self, text: str) -> dict:
+        """Embed (without blocking the event loop) and classify a query"""
+        if self.aembed_query is None:
+            return self.classify(text)
+        return self.classify_vector(await self.aembed_query(text))
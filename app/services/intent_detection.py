@@ -1,17 +1,112 @@
-from openai import OpenAI
-from app.config.settings import MODEL_CONFIG
+from llama_index.core import Settings
+from app.config.settings import MODEL_CONFIG, INTENT_CLASSIFIER_CONFIG
+from app.services.intent_classifier import EmbeddingIntentClassifier
+from app.models.request_context import RequestContext
+from app.utils.openai_client import get_client, get_async_client, timeout_for
+from collections import Counter
 import json
+import logging
+import re
+import threading
 
-class IntentDetectionService:
-    def __init__(self):
-        self.client = OpenAI()
-        self.model = MODEL_CONFIG['MODEL_NAME']
+# Set up logging
+logger = logging.getLogger(__name__)
 
-    def detect_intent(self, user_query: str) -> dict:
-        """Detect the intent of the user's query"""
-        try:
-            messages = [
-                {"role": "system", "content": """You are an intent detection system. Analyze the user's message and determine their intent.
+# Intents that open the appointment form in the UI
+APPOINTMENT_INTENTS = ("schedule_appointment", "cancel_appointment", "check_status")
+
+# (rule name, intent, pattern) for messages whose intent is obvious from wording alone.
+# A rule with intent None marks questions about rules rather than actions ("cancellation
+# policy", "退款"); when it matches, nothing is settled and the models decide.
+INTENT_RULES = [
+    ("cancel_en", "cancel_appointment",
+     r"\bcancel(?:l?ing)?\s+(?:(?:my|the|a|an|our|this|that|his|her)\s+)?(?:\w+\s+)?"
+     r"(?:appointments?|class(?:es)?|bookings?|lessons?|sessions?|reservations?|trial|consultation)\b"
+     r"|\b(?:i|we)(?:\s+(?:want|need|would like|have)|'d like)\s+to\s+cancel\b|\bcall off\b"),
+    ("cancel_zh", "cancel_appointment",
+     r"取消(?:我的|一下|这个|那个)?(?:预约|预定|课程|课|试听)|(?:我要|我想|帮我|请)取消|撤销预约|终止预约"),
+    ("policy_en", None, r"\bpolic(?:y|ies)\b|\brefund\w*|\bterms\b"),
+    ("policy_zh", None, r"政策|规定|退款|退费"),
+    ("status_en", "check_status",
+     r"\b(?:check|view|see|look up)\s+(?:on\s+)?(?:my\s+)?(?:appointments?|bookings?|reservations?)\b"
+     r"|\b(?:appointment|booking)\s+(?:status|history)\b"),
+    ("status_zh", "check_status", r"(?:查询|查看|查一下)(?:我的)?预约|预约(?:状态|记录|历史)"),
+    ("schedule_en", "schedule_appointment",
+     r"\b(?:book|schedule|reserve)\s+(?:a|an|my|the|me)?\s*(?:free\s+|trial\s+)?"
+     r"(?:class|lesson|session|appointment|trial|consultation|time|slot|tutor)"
+     r"|\b(?:make|set up)\s+an?\s+appointment\b|\bsign\s+(?:me\s+)?up\b"),
+    ("schedule_zh", "schedule_appointment", r"预约|预定|约(?:个|一下|一个)?(?:时间|课|老师)|报名|试听"),
+    # "how much", "charge" and "rate" alone also ask about homework, who is in charge or pass rates
+    ("price_en", "price_query",
+     r"\bhow much(?:\s+(?:is|are|for)\b|'s\b|\s+(?:do|does)\s+(?:you|it)\s+charge\b)"
+     r"|\bcharges?\s+for\b|\b(?:tuition|hourly|class|lesson)\s+rates?\b|\brates?\s+for\b"
+     r"|\b(?:price|prices|pricing|cost|costs|fee|fees|tuition|discounts?)\b"),
+    ("price_zh", "price_query", r"多少钱|价格|价钱|学费|收费|费用|优惠|折扣|贵不贵"),
+]
+
+# When several appointment rules match, the more specific intent wins
+# ("cancel my appointment", "查询预约"); appointment + price wording is left to the models.
+RULE_PRECEDENCE = ["cancel_appointment", "check_status", "schedule_appointment", "price_query"]
+
+
+class IntentRuleEngine:
+    """All intent rules compiled into one case-insensitive alternation with per-rule hit counters"""
+
+    def __init__(self, rules: list):
+        self.rule_intents = {name: intent for name, intent, _ in rules}
+        self.pattern = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, _, pattern in rules),
+            re.IGNORECASE
+        )
+        self._lock = threading.Lock()
+        self.rule_hits = Counter()
+        self.decided = 0
+        self.ambiguous = 0
+        self.unmatched = 0
+
+    def match(self, user_query: str):
+        """Return an intent dict with confidence 1.0, or None when no rule settles the query"""
+        matched = {}
+        for m in self.pattern.finditer(user_query):
+            matched.setdefault(self.rule_intents[m.lastgroup], []).append(m.lastgroup)
+
+        intent = None
+        if matched and None not in matched and not ("price_query" in matched and len(matched) > 1):
+            intent = next(name for name in RULE_PRECEDENCE if name in matched)
+
+        with self._lock:
+            for rule_names in matched.values():
+                self.rule_hits.update(rule_names)
+            if intent is not None:
+                self.decided += 1
+            elif matched:
+                self.ambiguous += 1
+            else:
+                self.unmatched += 1
+
+        if intent is None:
+            return None
+        return {
+            "intent": intent,
+            "confidence": 1.0,
+            "explanation": f"Matched rule {', '.join(sorted(set(matched[intent])))}"
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rule_hits": {name: self.rule_hits.get(name, 0) for name in self.rule_intents},
+                "decided": self.decided,
+                "ambiguous": self.ambiguous,
+                "unmatched": self.unmatched
+            }
+
+
+# Shared by every IntentDetectionService so the counters cover the whole process
+RULE_ENGINE = IntentRuleEngine(INTENT_RULES)
+
+# Few-shot prompt for the LLM fallback
+INTENT_DETECTION_PROMPT = """You are an intent detection system. Analyze the user's message and determine their intent.
                 Respond with a JSON object containing:
                 - "intent": one of ["schedule_appointment", "price_query", "general_query"]
                 - "confidence": a number between 0 and 1
@@ -35,20 +130,122 @@ class IntentDetectionService:
                 - "What are the rates?"
                 - "Is there a discount?"
                 - "Do you have any special offers?"
-                """},
-                {"role": "user", "content": user_query}
-            ]
+                """
+
+
+class IntentDetectionService:
+    def __init__(self):
+        self.client = get_client()
+        self.async_client = get_async_client()
+        self.model = MODEL_CONFIG['MODEL_NAME']
+        self.rules = RULE_ENGINE
+        self.margin_threshold = INTENT_CLASSIFIER_CONFIG['MARGIN_THRESHOLD']
+        self.local_classifier = None
+        try:
+            # Settings.embed_model is the cached embedding installed by VectorStoreService
+            self.local_classifier = EmbeddingIntentClassifier.from_config(Settings.embed_model)
+        except Exception as e:
+            logger.error(f"Local intent classifier unavailable, using the LLM only: {str(e)}")
+
+    def detect_intent(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """
+        Detect the intent of the user's query
+
+        Obvious wording is settled by the rule engine, then the local embedding
+        classifier answers when its margin is clear; ambiguous queries fall
+        through to the LLM.
+        """
+        rule_intent = self.match_rules(user_query)
+        if rule_intent is not None:
+            return rule_intent
+        return self.detect_intent_model(user_query, ctx)
+
+    def match_rules(self, user_query: str):
+        """Return the rule engine's intent for the query, or None when no rule settles it"""
+        rule_intent = self.rules.match(user_query)
+        if rule_intent is not None:
+            logger.info(f"Rule intent: {rule_intent['intent']} ({rule_intent['explanation']})")
+        return rule_intent
+
+    def detect_intent_model(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """Detect the intent with the local classifier, falling back to the LLM when ambiguous"""
+        if self.local_classifier is not None:
+            try:
+                local_intent = self._confident(self.local_classifier.classify(user_query))
+                if local_intent is not None:
+                    return local_intent
+            except Exception as e:
+                logger.error(f"Error in local intent classification: {str(e)}")
+        return self.detect_intent_llm(user_query, ctx)
+
+    def _confident(self, local_intent: dict):
+        """Return the local result when its margin is clear, otherwise None"""
+        if local_intent["margin"] >= self.margin_threshold:
+            logger.info(f"Local intent: {local_intent['intent']} (margin {local_intent['margin']:.3f})")
+            return local_intent
+        logger.info(f"Ambiguous local intent (margin {local_intent['margin']:.3f}), asking the LLM")
+        return None
+
+    def _llm_messages(self, user_query: str) -> list:
+        return [
+            {"role": "system", "content": INTENT_DETECTION_PROMPT},
+            {"role": "user", "content": user_query}
+        ]
+
+    def detect_intent_llm(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """Detect the intent of the user's query with the LLM"""
+        try:
+            messages = self._llm_messages(user_query)
             
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.3,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                timeout=timeout_for("intent_detection")
             )
             
+            if ctx is not None:
+                ctx.add_usage("intent_detection", response.usage)
+
             # Parse the JSON response
             intent_data = json.loads(response.choices[0].message.content)
             return intent_data
         except Exception as e:
-            print(f"Error in detect_intent: {str(e)}")
-            return {"intent": "general_query", "confidence": 0.0, "explanation": "Error in intent detection"} 
\ No newline at end of file
+            logger.error(f"Error in detect_intent_llm: {str(e)}")
+            return {"intent": "general_query", "confidence": 0.0, "explanation": "Error in intent detection"} 
+
+    async def adetect_intent(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """Async variant of detect_intent for the ASGI entry point"""
+        rule_intent = self.match_rules(user_query)
+        if rule_intent is not None:
+            return rule_intent
+        return await self.adetect_intent_model(user_query, ctx)
+
+    async def adetect_intent_model(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """Async variant of detect_intent_model"""
+        if self.local_classifier is not None:
+            try:
+                local_intent = self._confident(await self.local_classifier.aclassify(user_query))
+                if local_intent is not None:
+                    return local_intent
+            except Exception as e:
+                logger.error(f"Error in local intent classification: {str(e)}")
+        return await self.adetect_intent_llm(user_query, ctx)
+
+    async def adetect_intent_llm(self, user_query: str, ctx: RequestContext = None) -> dict:
+        """Async variant of detect_intent_llm using the AsyncOpenAI client"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._llm_messages(user_query),
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                timeout=timeout_for("intent_detection")
+            )
+            if ctx is not None:
+                ctx.add_usage("intent_detection", response.usage)
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error in adetect_intent_llm: {str(e)}")
+            return {"intent": "general_query", "confidence": 0.0, "explanation": "Error in intent detection"}
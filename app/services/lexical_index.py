@@ -0,0 +1,110 @@
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from llama_index.core import QueryBundle
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Latin words keep digits attached so course tokens like "1on2" or "sat" survive
+_LATIN_RE = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+_CJK_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_TOKEN_RE = re.compile(f"{_LATIN_RE.pattern}|{_CJK_RE.pattern}")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split bilingual text into BM25 terms
+
+    English/number runs become lowercase words; Chinese runs become overlapping
+    character bigrams (a single character is kept as-is).
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if _CJK_RE.fullmatch(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index over LlamaIndex nodes"""
+
+    def __init__(self, nodes: Sequence[BaseNode], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.nodes = list(nodes)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths = []
+        for doc_idx, node in enumerate(self.nodes):
+            terms = Counter(tokenize(node.get_content(metadata_mode=MetadataMode.NONE)))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self.postings[term].append((doc_idx, freq))
+
+        n_docs = len(self.nodes)
+        self.avg_doc_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        logger.info(f"Built BM25 index with {n_docs} chunks and {len(self.postings)} terms")
+
+    def search(self, query: str, top_k: int) -> List[Tuple[BaseNode, float]]:
+        """Return up to top_k (node, score) pairs with a positive BM25 score"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_doc_length)
+                scores[doc_idx] += idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.nodes[doc_idx], score) for doc_idx, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists, scoring each id by sum(1 / (k + rank))"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking, start=1):
+            fused[node_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Combine dense vector retrieval with BM25 using reciprocal-rank fusion"""
+
+    def __init__(self, vector_retriever: BaseRetriever, bm25_index: BM25Index,
+                 top_k: int, bm25_top_k: int, rrf_k: int = 60):
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.bm25_index = bm25_index
+        self.top_k = top_k
+        self.bm25_top_k = bm25_top_k
+        self.rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        dense = self.vector_retriever.retrieve(query_bundle)
+        lexical = self.bm25_index.search(query_bundle.query_str, self.bm25_top_k)
+
+        nodes = {result.node.node_id: result.node for result in dense}
+        for node, _ in lexical:
+            nodes.setdefault(node.node_id, node)
+
+        fused = reciprocal_rank_fusion(
+            [[result.node.node_id for result in dense], [node.node_id for node, _ in lexical]],
+            k=self.rrf_k
+        )
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in fused[:self.top_k]]
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from pydantic import PrivateAttr
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = (None, "float16", "int8")
+
+# Rows converted to float32 at a time when scoring a quantized matrix
+SCORE_BLOCK_ROWS = 8192
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Vector store that keeps all embeddings in one contiguous NumPy matrix
+
+    Vectors are L2-normalized on insert, so a single matmul against the
+    normalized query gives cosine similarities. The matrix can be stored as
+    float32, float16 or int8 (symmetric per-row scale) and is memory-mapped
+    when loaded from disk, so worker processes share the pages.
+    """
+
+    stores_text: bool = False
+    quantization: Optional[str] = None
+
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _scales: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    def __init__(self, quantization: Optional[str] = None, **kwargs: Any):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        super().__init__(quantization=quantization, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def dtype(self):
+        return {None: np.float32, "float16": np.float16, "int8": np.int8}[self.quantization]
+
+    @property
+    def size(self) -> int:
+        """Number of stored vectors (not __len__: StorageContext tests stores for truthiness)"""
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the embedding matrix and scales"""
+        total = self._matrix.nbytes if self._matrix is not None else 0
+        if self._scales is not None:
+            total += self._scales.nbytes
+        return total
+
+    def _encode(self, vectors: np.ndarray):
+        """Normalize and quantize a float32 matrix, returning (matrix, scales)"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+            quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+            return quantized, scales
+        return vectors.astype(self.dtype), None
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Append node embeddings to the matrix"""
+        if not nodes:
+            return []
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        matrix, scales = self._encode(vectors)
+        if self._matrix is None:
+            self._matrix, self._scales = matrix, scales
+        else:
+            self._matrix = np.concatenate([self._matrix, matrix])
+            if scales is not None:
+                self._scales = np.concatenate([self._scales, scales])
+        ids = [node.node_id for node in nodes]
+        self._ids.extend(ids)
+        self._ref_doc_ids.extend(node.ref_doc_id for node in nodes)
+        return ids
+
+    def _keep_rows(self, keep: np.ndarray) -> None:
+        self._matrix = self._matrix[keep]
+        if self._scales is not None:
+            self._scales = self._scales[keep]
+        self._ids = [node_id for node_id, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [ref for ref, k in zip(self._ref_doc_ids, keep) if k]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Drop every row that belongs to the given document"""
+        if self._matrix is None:
+            return
+        keep = np.array([ref != ref_doc_id for ref in self._ref_doc_ids], dtype=bool)
+        if not keep.all():
+            self._keep_rows(keep)
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs: Any) -> None:
+        if filters is not None:
+            raise NotImplementedError("Metadata filters are not supported by NumpyVectorStore")
+        if self._matrix is None or not node_ids:
+            return
+        node_ids = set(node_ids)
+        self._keep_rows(np.array([node_id not in node_ids for node_id in self._ids], dtype=bool))
+
+    def clear(self) -> None:
+        self._ids, self._ref_doc_ids = [], []
+        self._matrix, self._scales = None, None
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the normalized query against every row"""
+        if self._matrix.dtype == np.float32:
+            return self._matrix @ query
+        # float16/int8 have no BLAS kernels, so upcast a block at a time
+        scores = np.empty(self._matrix.shape[0], dtype=np.float32)
+        for start in range(0, self._matrix.shape[0], SCORE_BLOCK_ROWS):
+            block = self._matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + SCORE_BLOCK_ROWS] = block @ query
+        if self._scales is not None:
+            scores *= self._scales
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Return the top-k most similar node ids"""
+        if query.filters is not None:
+            raise NotImplementedError("Metadata filters are not supported by NumpyVectorStore")
+        if self._matrix is None or not self._ids or query.query_embedding is None:
+            return VectorStoreQueryResult(ids=[], similarities=[])
+
+        vector = np.asarray(query.query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        scores = self._scores(vector)
+
+        if query.node_ids:
+            allowed = set(query.node_ids)
+            mask = np.array([node_id in allowed for node_id in self._ids], dtype=bool)
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(query.similarity_top_k, len(self._ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+        return VectorStoreQueryResult(
+            ids=[self._ids[i] for i in top],
+            similarities=[float(scores[i]) for i in top]
+        )
+
+    @staticmethod
+    def _paths(persist_path: str):
+        base = os.path.splitext(persist_path)[0]
+        return persist_path, f"{base}.npy", f"{base}.scales.npy"
+
+    @staticmethod
+    def _save_array(path: str, array: np.ndarray) -> None:
+        # Write next to the target and rename, so a memory-mapped reader keeps a valid file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        """Store the matrix as .npy next to a JSON file with ids and settings"""
+        meta_path, matrix_path, scales_path = self._paths(persist_path)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=self.dtype)
+        self._save_array(matrix_path, matrix)
+        if self._scales is not None:
+            self._save_array(scales_path, self._scales)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "class_name": self.class_name(),
+                "quantization": self.quantization,
+                "ids": self._ids,
+                "ref_doc_ids": self._ref_doc_ids
+            }, f)
+        os.replace(tmp_path, meta_path)
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, mmap: bool = True) -> "NumpyVectorStore":
+        """Load a persisted store, memory-mapping the matrix by default"""
+        meta_path, matrix_path, scales_path = cls._paths(persist_path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("class_name") != cls.class_name():
+            raise ValueError(f"{meta_path} was not written by {cls.class_name()}")
+
+        store = cls(quantization=meta.get("quantization"))
+        store._ids = meta["ids"]
+        store._ref_doc_ids = meta["ref_doc_ids"]
+        if store._ids:
+            store._matrix = np.load(matrix_path, mmap_mode="r" if mmap else None)
+            if store.quantization == "int8":
+                store._scales = np.load(scales_path)
+        logger.info(f"Loaded {store.size} vectors ({store.quantization or 'float32'}) from {matrix_path}")
+        return store
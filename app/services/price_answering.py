@@ -0,0 +1,275 @@
+"""
+Template answers for direct price lookups.
+
+"SAT 1on1 多少钱" or "price of ESL 1on2 for high school" has an exact answer
+in prices.csv, so it is answered from a bilingual template without any
+model call. Course families are recognised by the price table's English and
+Chinese aliases, then by trigram similarity, which tolerates typos such as
+"writting" or "hunterr". Only unambiguous lookups are answered here: one
+course family, an offered combination, and nothing besides the price asked
+(discounts, comparisons, booking, official exam fees); everything else goes
+through the model. A course name recognised only by a typo-tolerant or
+generic match ("essay", "math") is not enough on its own: the question must
+also name a format or level.
+"""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config.settings import PRICE_ANSWERING_CONFIG
+from app.services.price_table import PriceRow, PriceTable, get_price_table, parse_price_query
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# "how much" alone also asks about homework, time or score gains; only "how much is/are/for ..." asks a price
+PRICE_WORDING = (r"\b(?:prices?|pricing|costs?|fees?|tuition)\b"
+                 r"|\bhow much(?:\s+(?:is|are|for)\b|'s\b)"
+                 r"|多少钱|价格|价钱|费用|学费|收费")
+_PRICE_RE = re.compile(PRICE_WORDING, re.IGNORECASE | re.ASCII)
+# Anything beyond the list price needs the model (or the appointment flow); stems catch
+# "refundable", "registration". Official exam fees are not tutoring prices.
+_EXCLUDE_RE = re.compile(
+    r"\b(?:discount\w*|deals?|promo\w*|coupons?|refund\w*|installments?|payment plans?|pay\w*|cheap\w*|"
+    r"compar\w*|difference|vs|versus|why|worth|book\w*|schedul\w*|appointments?|"
+    r"sign up|regist\w*|enrol\w*|cancel\w*|official\w*|(?:exam|test)\s+fees?)\b"
+    r"|优惠|折扣|便宜|退款|退费|分期|比较|区别|为什么|预约|报名|注册|取消|付款|考试费|报名费",
+    re.IGNORECASE | re.ASCII
+)
+# Format-like tokens ("1on3", "1 v 2", "group of 5", "一对三"), to catch formats that are not offered
+_FORMAT_LIKE_RE = re.compile(
+    r"\b(\d)\s*(?:-?\s*on\s*-?|v|vs)\s*(\d)\b|\bgroup of (\d+)\b|一对([一二三四五六七八九十\d])",
+    re.IGNORECASE | re.ASCII
+)
+_FORMAT_DIGITS = {"一": "1", "二": "2", "三": "3", "四": "4", "五": "5", "六": "6", "七": "7", "八": "8",
+                  "九": "9", "十": "10"}
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Plain English names per course family for fuzzy matching (families only in prices.csv use their own name)
+FUZZY_TERMS = {
+    "SAT": ["sat"],
+    "ACT": ["act"],
+    "SHSAT": ["shsat"],
+    "ESL": ["esl"],
+    "Writing": ["writing"],
+    "Regent": ["regent", "regents"],
+    "School Subject": ["school subject", "subject", "math", "science"],
+    "Hornor course": ["honors course", "honors"],
+    "State Test": ["state test"],
+    "Hunter": ["hunter"]
+}
+
+# Names shown to users where prices.csv spells them differently
+FAMILY_EN = {"Hornor course": "Honors course"}
+FAMILY_ZH = {
+    "ESL": "ESL英语",
+    "Writing": "写作",
+    "Regent": "Regents会考",
+    "School Subject": "校内学科",
+    "Hornor course": "荣誉课程",
+    "State Test": "州考",
+    "Hunter": "Hunter亨特",
+    "SHSAT": "SHSAT特殊高中考试"
+}
+FORMAT_ZH = {"1on1": "一对一", "1on2": "一对二", "1on4": "一对四"}
+VARIANT_ZH = {"summer": "暑期班", "sprint": "冲刺班", "regular": "常规班"}
+LEVEL_ZH = {"primary": "小学（1-5年级）", "middle": "初中（6-8年级）", "high": "高中（9-12年级）"}
+
+CONTACT_EN = "To enroll or ask about discounts, contact us at 718-971-9914 or newturbony@gmail.com."
+CONTACT_ZH = "如需报名或咨询优惠，请致电 718-971-9914 或发送邮件至 newturbony@gmail.com。"
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of each word, padded as in PostgreSQL's pg_trgm"""
+    grams = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Share of trigrams in common (Jaccard index)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PriceAnsweringEngine:
+    """Answers unambiguous price lookups from the price table"""
+
+    def __init__(self, price_table: PriceTable, fuzzy_threshold: float, max_rows: int):
+        self.price_table = price_table
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._index_families: Tuple[str, ...] = ()
+        # trigram -> terms containing it; term -> (family, trigrams)
+        self._index: Dict[str, Set[str]] = {}
+        self._terms: Dict[str, Tuple[str, Set[str]]] = {}
+
+    def _build_index(self, families: Tuple[str, ...]) -> None:
+        """Trigram index over the names of the families in the table (caller holds the lock)"""
+        index, terms = defaultdict(set), {}
+        for family in families:
+            for term in FUZZY_TERMS.get(family, [family.lower()]):
+                # Words under 4 letters have too few trigrams to tell a typo from another word
+                if len(term) < 4:
+                    continue
+                grams = trigrams(term)
+                terms[term] = (family, grams)
+                for gram in grams:
+                    index[gram].add(term)
+        self._index, self._terms, self._index_families = dict(index), terms, families
+
+    def fuzzy_families(self, query: str) -> Dict[str, float]:
+        """
+        Course families whose names are similar to words of the question
+
+        Each one- or two-word window is compared with the names of the same
+        word count; candidates come from the trigram index.
+
+        Returns:
+            Best similarity per family, for families at or above the threshold
+        """
+        families = tuple(sorted({row.family for row in self.price_table.rows()}))
+        with self._lock:
+            if families != self._index_families:
+                self._build_index(families)
+            index, terms = self._index, self._terms
+
+        words = _WORD_RE.findall(query.lower())
+        scores: Dict[str, float] = {}
+        for size in (1, 2):
+            for i in range(len(words) - size + 1):
+                window = " ".join(words[i:i + size])
+                if len(window) < 4:
+                    continue
+                grams = trigrams(window)
+                candidates = set().union(*(index.get(gram, set()) for gram in grams))
+                for term in candidates:
+                    if len(term.split()) != size:
+                        continue
+                    family, term_grams = terms[term]
+                    score = similarity(grams, term_grams)
+                    if score >= self.fuzzy_threshold and score > scores.get(family, 0.0):
+                        scores[family] = score
+        return scores
+
+    @staticmethod
+    def mentioned_formats(query: str) -> Set[str]:
+        """Formats written as "1on3", "1 v 2", "group of 4" or "一对三", normalised to "1onN" """
+        formats = set()
+        for m in _FORMAT_LIKE_RE.finditer(query):
+            if m.group(1):
+                formats.add(f"{m.group(1)}on{m.group(2)}")
+            elif m.group(3):
+                formats.add(f"1on{m.group(3)}")
+            else:
+                formats.add(f"1on{_FORMAT_DIGITS.get(m.group(4), m.group(4))}")
+        return formats
+
+    def match(self, query: str) -> Optional[List[PriceRow]]:
+        """
+        Price rows that answer the question, or None when it is not a direct price lookup
+
+        Not a direct lookup: no price wording, anything besides the price
+        asked, zero or several course families, a family recognised only by
+        a fuzzy or generic match with no format or level named, a format
+        that is not offered, a combination that is not offered, or more than
+        max_rows rows.
+        """
+        if not _PRICE_RE.search(query) or _EXCLUDE_RE.search(query):
+            return None
+        table = self.price_table.rows()
+        price_query = parse_price_query(query, generic=False)
+        formats = set(price_query.formats)
+        mentioned = self.mentioned_formats(query)
+        if mentioned - {row.format for row in table}:
+            return None
+        formats |= mentioned
+
+        families = set(price_query.families)
+        if not families:
+            # Weaker evidence: only answer when the question also pins down a format or level
+            if not (formats or price_query.levels):
+                return None
+            families = set(parse_price_query(query).families) or set(self.fuzzy_families(query))
+        if len(families) != 1:
+            return None
+        family = families.pop()
+        rows = [
+            row for row in table
+            if row.family == family
+            and (not formats or row.format in formats)
+            and (not price_query.levels or row.level_key in price_query.levels)
+        ]
+        if not rows or len(rows) > self.max_rows:
+            return None
+        return rows
+
+    @staticmethod
+    def _variant(row: PriceRow) -> str:
+        """What follows the format in the course name, e.g. "summer" in "SAT 1on4 (summer)" """
+        if not row.format:
+            return ""
+        tail = row.course[row.course.lower().find(row.format) + len(row.format):]
+        return tail.strip(" ()")
+
+    def _line_en(self, row: PriceRow) -> str:
+        course = FAMILY_EN.get(row.family, row.family) + row.course[len(row.family):]
+        return f"- {course}, {row.level}: ${row.price:,} for {row.hours} hours (${row.price / row.hours:,.0f}/hour)"
+
+    def _line_zh(self, row: PriceRow) -> str:
+        variant = self._variant(row)
+        name = " ".join(part for part in (
+            FAMILY_ZH.get(row.family, row.family),
+            FORMAT_ZH.get(row.format, row.format),
+            VARIANT_ZH.get(variant.lower(), variant)
+        ) if part)
+        level = LEVEL_ZH.get(row.level_key, row.level)
+        return f"- {name}，{level}：{row.hours}小时，${row.price:,}（每小时${row.price / row.hours:,.0f}）"
+
+    def format_answer(self, rows: List[PriceRow]) -> str:
+        """Bilingual answer listing the rows"""
+        family = rows[0].family
+        lines = [f"Here are the prices for {FAMILY_EN.get(family, family)}:"]
+        lines.extend(self._line_en(row) for row in rows)
+        lines.append("")
+        lines.append(f"以下是{FAMILY_ZH.get(family, family)}的价格：")
+        lines.extend(self._line_zh(row) for row in rows)
+        lines.append("")
+        lines.append(CONTACT_EN)
+        lines.append(CONTACT_ZH)
+        return "\n".join(lines)
+
+    def answer(self, query: str) -> Optional[str]:
+        """
+        Template answer for a direct price lookup
+
+        Returns:
+            The answer, or None when the question should go to the model
+        """
+        try:
+            rows = self.match(query)
+        except Exception as e:
+            logger.error(f"Error matching price question: {str(e)}")
+            return None
+        if rows is None:
+            return None
+        logger.info(f"Answered price lookup from the price table ({len(rows)} rows)")
+        return self.format_answer(rows)
+
+
+def create_price_answering() -> Optional[PriceAnsweringEngine]:
+    """Build the price answering engine from PRICE_ANSWERING_CONFIG, or None when disabled"""
+    if not PRICE_ANSWERING_CONFIG['ENABLED']:
+        return None
+    return PriceAnsweringEngine(
+        get_price_table(),
+        fuzzy_threshold=PRICE_ANSWERING_CONFIG['FUZZY_THRESHOLD'],
+        max_rows=PRICE_ANSWERING_CONFIG['MAX_ROWS']
+    )
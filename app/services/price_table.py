@@ -0,0 +1,271 @@
+"""
+In-memory price table built from prices.csv.
+
+The CSV is parsed once and reloaded only when its modification time
+changes. Rows are indexed by course family (SAT, ESL, ...), class format
+(1on1 / 1on2 / 1on4) and school level, so a price question gets just the
+rows it is about ("SAT 1on1 for a 10th grader") instead of the whole table.
+A combination that is not offered is relaxed (format first, then level) to
+the nearest rows, so the model can still say what is available; questions
+that name none of these get the full table.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from app.config.settings import PRICES_CSV_PATH
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PRICE_HEADER = "Here are our course prices:"
+
+# Course family (as written in prices.csv) -> how users refer to it, in English and Chinese
+FAMILY_ALIASES = {
+    "SAT": [r"\bsat\b"],
+    "ACT": [r"\bact\b"],
+    "SHSAT": [r"\bshsat\b", "特殊高中", "特高"],
+    "ESL": [r"\besl\b", r"english as a second language", "英语", "英文"],
+    "Writing": [r"\bwriting\b", "写作", "作文"],
+    "Regent": [r"\bregents?\b", "会考"],
+    "School Subject": [r"\bschool subjects?\b", "学科", "校内"],
+    "Hornor course": [r"\bhonou?rs?\b", r"\bhornor\b", "荣誉"],
+    "State Test": [r"\bstate tests?\b", r"\bstate exams?\b", "州考"],
+    "Hunter": [r"\bhunter\b", "亨特"]
+}
+
+# Words that usually, but not always, mean a family ("college essay help" is not the Writing course);
+# good enough to pick price rows for the model, not to answer without it
+GENERIC_FAMILY_ALIASES = {
+    "Writing": [r"\bessays?\b"],
+    "School Subject": [r"\bsubjects?\b", r"\bmath\b", r"\bscience\b", "数学", "科学"]
+}
+
+FORMAT_ALIASES = {
+    "1on1": [r"\b1\s*on\s*1\b", r"\b1\s*-\s*on\s*-\s*1\b", r"\bone[\s-]on[\s-]one\b", r"\bprivate\b", "一对一"],
+    "1on2": [r"\b1\s*on\s*2\b", r"\bone[\s-]on[\s-]two\b", r"\bpairs?\b", "一对二"],
+    "1on4": [r"\b1\s*on\s*4\b", r"\bone[\s-]on[\s-]four\b", r"\bsmall groups?\b", r"\bgroup\b", "一对四", "小班"]
+}
+
+LEVEL_ALIASES = {
+    "primary": [r"\bprimary\b", r"\belementary\b", "小学"],
+    "middle": [r"\bmiddle school\b", r"\bjunior high\b", "初中", "初一", "初二", "初三"],
+    "high": [r"\bhigh school\b", r"\bhigh schooler\b", "高中", "高一", "高二", "高三"]
+}
+
+_CHINESE_NUMERALS = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9,
+                     "十": 10, "十一": 11, "十二": 12}
+# re.ASCII: \b must also hold between Chinese and Latin text ("高中SAT")
+_GRADE_RES = [
+    re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?[\s-]*grader?s?\b", re.ASCII),
+    re.compile(r"\bgrade\s*(\d{1,2})\b", re.ASCII),
+    re.compile(r"(\d{1,2}|十[一二]?|[一二三四五六七八九])\s*年级")
+]
+_FORMAT_RE = re.compile(r"\b1on[124]\b", re.IGNORECASE)
+
+
+def _compile(aliases: Dict[str, List[str]]) -> Dict[str, re.Pattern]:
+    return {key: re.compile("|".join(patterns), re.IGNORECASE | re.ASCII) for key, patterns in aliases.items()}
+
+
+_FAMILY_RES = _compile(FAMILY_ALIASES)
+_GENERIC_FAMILY_RES = _compile(GENERIC_FAMILY_ALIASES)
+_FORMAT_RES = _compile(FORMAT_ALIASES)
+_LEVEL_RES = _compile(LEVEL_ALIASES)
+
+
+def level_for_grade(grade: int) -> Optional[str]:
+    if 1 <= grade <= 5:
+        return "primary"
+    if 6 <= grade <= 8:
+        return "middle"
+    if 9 <= grade <= 12:
+        return "high"
+    return None
+
+
+def _level_key(level: str) -> Optional[str]:
+    level = level.lower()
+    for key in LEVEL_ALIASES:
+        if level.startswith(key):
+            return key
+    return None
+
+
+@dataclass(frozen=True)
+class PriceRow:
+    """One course offering from prices.csv"""
+    course: str
+    family: str
+    format: str
+    level: str
+    level_key: Optional[str]
+    hours: int
+    price: int
+
+    def text(self) -> str:
+        return f"{self.course} - {self.level}: {self.hours} hours, ${self.price}"
+
+
+@dataclass(frozen=True)
+class PriceQuery:
+    """The families, formats and levels a question mentions (empty sets: not mentioned)"""
+    families: frozenset
+    formats: frozenset
+    levels: frozenset
+
+    def is_empty(self) -> bool:
+        return not (self.families or self.formats or self.levels)
+
+
+def parse_price_query(query: str, generic: bool = True) -> PriceQuery:
+    """
+    Course families, formats and school levels mentioned in a question
+
+    Args:
+        query: The user's question
+        generic: Also count GENERIC_FAMILY_ALIASES ("math", "essay") as naming a family
+    """
+    families = {family for family, pattern in _FAMILY_RES.items() if pattern.search(query)}
+    if generic:
+        families |= {family for family, pattern in _GENERIC_FAMILY_RES.items() if pattern.search(query)}
+    formats = {fmt for fmt, pattern in _FORMAT_RES.items() if pattern.search(query)}
+    levels = {level for level, pattern in _LEVEL_RES.items() if pattern.search(query)}
+    for grade_re in _GRADE_RES:
+        for match in grade_re.finditer(query.lower()):
+            value = match.group(1)
+            grade = int(value) if value.isdigit() else _CHINESE_NUMERALS.get(value, 0)
+            level = level_for_grade(grade)
+            if level is not None:
+                levels.add(level)
+    # "School Subject" aliases ("subject", "math") are generic; a named test or course is more specific
+    if len(families) > 1:
+        families.discard("School Subject")
+    return PriceQuery(frozenset(families), frozenset(formats), frozenset(levels))
+
+
+class PriceTable:
+    """Price rows from prices.csv, reloaded when the file changes"""
+
+    def __init__(self, path: str = PRICES_CSV_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        # (rows, full text, family index, format index, level index), replaced as a whole on reload
+        self._snapshot: Tuple[List[PriceRow], str, Dict[str, Set[int]], Dict[str, Set[int]], Dict[str, Set[int]]] = \
+            ([], "", {}, {}, {})
+
+    @staticmethod
+    def _parse_row(course: str, hours, price, level: str) -> PriceRow:
+        course = str(course).strip()
+        match = _FORMAT_RE.search(course)
+        family = course[:match.start()].strip() if match else course
+        return PriceRow(
+            course=course,
+            family=family,
+            format=match.group(0).lower() if match else "",
+            level=str(level).strip(),
+            level_key=_level_key(str(level)),
+            hours=int(hours),
+            price=int(price)
+        )
+
+    def _load(self, mtime: float) -> None:
+        """Parse the CSV and rebuild the indexes (caller holds the lock)"""
+        df = pd.read_csv(self.path)
+        rows = [
+            self._parse_row(course, hours, price, level)
+            for course, hours, price, level in zip(df['Course Name'], df['Hours'], df['Price (USD)'], df['Course Level'])
+        ]
+        by_family, by_format, by_level = {}, {}, {}
+        for i, row in enumerate(rows):
+            by_family.setdefault(row.family, set()).add(i)
+            by_format.setdefault(row.format, set()).add(i)
+            by_level.setdefault(row.level_key, set()).add(i)
+        self._snapshot = (rows, self._format(rows), by_family, by_format, by_level)
+        self._mtime = mtime
+        logger.info(f"Loaded {len(rows)} price entries from {self.path}")
+
+    def _refresh(self) -> None:
+        """Reload the table if prices.csv changed since it was last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._mtime is None:
+                logger.error(f"Error loading price data: {str(e)}")
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    self._load(mtime)
+                except Exception as e:
+                    # Keep serving the last good table; retried when the file changes again
+                    logger.error(f"Error loading price data: {str(e)}")
+                    self._mtime = mtime
+
+    @staticmethod
+    def _format(rows: List[PriceRow]) -> str:
+        if not rows:
+            return ""
+        return PRICE_HEADER + "\n" + "\n".join(row.text() for row in rows)
+
+    def rows(self) -> List[PriceRow]:
+        self._refresh()
+        return list(self._snapshot[0])
+
+    def full_text(self) -> str:
+        """The whole table, formatted for the prompt ("" when prices.csv cannot be read)"""
+        self._refresh()
+        return self._snapshot[1]
+
+    def matching_rows(self, query: str) -> Optional[List[PriceRow]]:
+        """
+        Rows for the families, formats and levels the question mentions
+
+        Returns:
+            Matching rows in file order, or None when the question names none
+            of them or nothing matches (the caller then uses the full table)
+        """
+        self._refresh()
+        price_query = parse_price_query(query)
+        if price_query.is_empty():
+            return None
+        rows, _, by_family, by_format, by_level = self._snapshot
+        constraints = [(price_query.families, by_family), (price_query.levels, by_level),
+                       (price_query.formats, by_format)]
+        # Drop the format, then the level, until something is offered
+        for keep in (3, 2, 1):
+            selected = set(range(len(rows)))
+            for wanted, index in constraints[:keep]:
+                if wanted:
+                    selected &= set().union(*(index.get(key, set()) for key in wanted))
+            if selected and len(selected) < len(rows):
+                return [rows[i] for i in sorted(selected)]
+        return None
+
+    def text_for(self, query: str) -> Optional[str]:
+        """Formatted matching rows for a question, or None when the full table applies"""
+        matching = self.matching_rows(query)
+        return self._format(matching) if matching is not None else None
+
+
+_price_table: Optional[PriceTable] = None
+_price_table_lock = threading.Lock()
+
+
+def get_price_table() -> PriceTable:
+    """The process-wide price table"""
+    global _price_table
+    if _price_table is None:
+        with _price_table_lock:
+            if _price_table is None:
+                _price_table = PriceTable()
+    return _price_table
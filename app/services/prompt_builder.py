@@ -0,0 +1,96 @@
+"""
+Chat prompt assembly laid out for provider-side prompt caching.
+
+OpenAI reuses the longest prompt prefix it has already seen (from 1024
+tokens, in 128-token steps) and bills those tokens as cached. Everything
+identical across requests therefore goes first, in the system message:
+system prompt, answering instructions, then the price table when the
+intent needs it. Conversation history, retrieved context, price rows picked
+for the question and the question itself come last, so they only ever
+invalidate the tail of the prompt.
+"""
+
+import logging
+from typing import List, Optional
+
+from app.config.settings import SYSTEM_PROMPT
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ANSWER_INSTRUCTIONS = """Answer the user's question based on the context sent with it, the conversation so far, and your knowledge as an AI assistant.
+If the answer cannot be found in the context, say 'I am not sure, but you can contact our support at 718-971-9914 or newturbony@gmail.com.'"""
+
+
+class PromptBuilder:
+    """Builds chat messages with the static parts first and the per-request parts last"""
+
+    def __init__(self, system_prompt: str = SYSTEM_PROMPT):
+        self.system_prompt = system_prompt
+
+    def system_message(self, price_info: Optional[str] = None, instructions: Optional[str] = None) -> dict:
+        """
+        The shared prefix: identical for every request with the same price table and instructions
+
+        Args:
+            price_info: Full price table text, or None when the intent does not need it
+            instructions: Extra mode-specific instructions (e.g. structured output)
+        """
+        parts = [self.system_prompt]
+        if instructions:
+            parts.append(instructions.strip())
+        parts.append(ANSWER_INSTRUCTIONS)
+        if price_info:
+            logger.info("Including price information in the system message")
+            parts.append(f"Pricing information:\n{price_info.strip()}")
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+    @staticmethod
+    def history_messages(query: str, conversation_history: list = None) -> List[dict]:
+        """
+        Earlier turns as chat messages
+
+        Sent as separate messages rather than spliced into one text block, so a
+        conversation's prompt for turn N+1 extends its prompt for turn N. The
+        UI includes the current message at the end of the history; that copy
+        is dropped because the question is sent with the context. A system
+        message (the session summary of older turns) is kept as is.
+        """
+        history = list(conversation_history or [])
+        if history and history[-1].get("role") == "user" and \
+                " ".join(str(history[-1].get("content", "")).lower().split()) == " ".join(query.lower().split()):
+            history.pop()
+        return [
+            {"role": msg.get("role") if msg.get("role") in ("user", "system") else "assistant",
+             "content": str(msg.get("content", ""))}
+            for msg in history
+        ]
+
+    def messages(self, query: str, context: str, conversation_history: list = None,
+                 price_info: Optional[str] = None, instructions: Optional[str] = None,
+                 relevant_prices: Optional[str] = None) -> List[dict]:
+        """
+        Full message list for an answer call
+
+        Args:
+            query: The user's question
+            context: Retrieved context for the question
+            conversation_history: Optional list of previous messages
+            price_info: Optional price table text
+            instructions: Optional mode-specific instructions
+            relevant_prices: Optional price rows matching the question
+
+        Returns:
+            System message, history messages, then one user message with context and question
+        """
+        history = self.history_messages(query, conversation_history)
+        if history:
+            logger.info(f"Including conversation history of {len(history)} messages")
+        if relevant_prices:
+            logger.info("Including matching price rows with the question")
+            context = f"{context}\n\nPricing information:\n{relevant_prices.strip()}"
+        return [
+            self.system_message(price_info, instructions),
+            *history,
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
+        ]
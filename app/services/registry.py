@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class ServiceUnavailable(Exception):
+    """Raised when a service is still warming up or failed to initialize"""
+
+
+class LazyService:
+    """A service constructed on first use or by the background warm-up thread"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.error = None
+        self.init_seconds = None
+        self._instance = None
+        self._init_lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _create(self) -> None:
+        """Construct the service; the caller must hold _init_lock"""
+        if self.state == READY:
+            return
+        self.state = WARMING
+        self._done.clear()
+        start = time.perf_counter()
+        try:
+            logger.info(f"Initializing {self.name}...")
+            self._instance = self.factory()
+            self.init_seconds = time.perf_counter() - start
+            self.state = READY
+            self.error = None
+            logger.info(f"{self.name} ready in {self.init_seconds:.2f}s")
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error(f"Failed to initialize {self.name}: {str(e)}")
+        finally:
+            self._done.set()
+
+    def warm(self) -> None:
+        with self._init_lock:
+            self._create()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Return the service instance
+
+        If nobody is building it yet, it is built in the calling thread. If the
+        warm-up thread is building it, wait up to timeout seconds (None waits
+        indefinitely) and raise ServiceUnavailable if it is still not ready.
+        """
+        if self.state == READY:
+            return self._instance
+        if self._init_lock.acquire(blocking=False):
+            try:
+                self._create()
+            finally:
+                self._init_lock.release()
+        elif not self._done.wait(timeout):
+            raise ServiceUnavailable(f"{self.name} is still warming up")
+        if self.state != READY:
+            raise ServiceUnavailable(f"{self.name} failed to initialize: {self.error}")
+        return self._instance
+
+    def status(self) -> dict:
+        status = {"state": self.state}
+        if self.init_seconds is not None:
+            status["init_seconds"] = round(self.init_seconds, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class ServiceRegistry:
+    """Lazily constructed services warmed up in registration order on a background thread"""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = OrderedDict()
+        self._warmup_thread = None
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        self._services[name] = LazyService(name, factory)
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        return self._services[name].get(timeout)
+
+    def start_warmup(self) -> None:
+        """Start constructing every registered service in the background"""
+        if self._warmup_thread is not None:
+            return
+
+        def warm_all():
+            for service in self._services.values():
+                service.warm()
+            logger.info("Service warm-up finished")
+
+        self._warmup_thread = threading.Thread(target=warm_all, name="service-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        names = list(names) if names is not None else list(self._services)
+        return all(self._services[name].state == READY for name in names)
+
+    def status(self) -> dict:
+        return {name: service.status() for name, service in self._services.items()}
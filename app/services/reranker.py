@@ -0,0 +1,140 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from llama_index.core import QueryBundle
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore
+from pydantic import Field, PrivateAttr
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class BatchingCrossEncoder:
+    """
+    Coalesce cross-encoder scoring requests from concurrent threads
+
+    A single worker thread takes the first pending request, keeps collecting
+    (query, passage) pairs until max_batch_size pairs are queued or max_wait_ms
+    has passed, and scores them all with one model.predict call.
+    """
+
+    def __init__(self, model: Any, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="rerank-batcher", daemon=True)
+        self._worker.start()
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """Score (query, passage) pairs, blocking until the batch they join is done"""
+        if not pairs:
+            return []
+        future = Future()
+        self._requests.put((list(pairs), future))
+        return future.result()
+
+    def _collect(self) -> list:
+        batch = [self._requests.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+            try:
+                scores = self.model.predict(pairs, batch_size=self.max_batch_size, show_progress_bar=False)
+            except Exception as e:
+                logger.error(f"Error in batched reranking: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            logger.debug(f"Reranked {len(pairs)} pairs from {len(batch)} requests in one batch")
+            offset = 0
+            for request_pairs, future in batch:
+                future.set_result([float(score) for score in scores[offset:offset + len(request_pairs)]])
+                offset += len(request_pairs)
+
+
+class CrossEncoderRerank(BaseNodePostprocessor):
+    """
+    Cross-encoder reranker, a drop-in replacement for SentenceTransformerRerank
+
+    Scores go through a BatchingCrossEncoder when batching is enabled, and
+    through an optional score cache (get/put by query and node) so repeated
+    (query, chunk) pairs are not scored twice.
+    """
+
+    model: str = Field(description="Sentence transformer model name.")
+    top_n: int = Field(description="Number of nodes to return sorted by score.")
+    _score_pairs: Callable[[List[Tuple[str, str]]], List[float]] = PrivateAttr()
+    _score_cache: Any = PrivateAttr()
+
+    def __init__(self, model: str, top_n: int, batching: bool = True, max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, score_cache: Any = None, device: Optional[str] = None):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError("Cannot import sentence-transformers, please `pip install sentence-transformers`")
+        super().__init__(model=model, top_n=top_n)
+        cross_encoder = CrossEncoder(model, device=device)
+        if batching:
+            self._score_pairs = BatchingCrossEncoder(
+                cross_encoder,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms
+            ).score
+        else:
+            self._score_pairs = lambda pairs: [
+                float(score) for score in cross_encoder.predict(pairs, show_progress_bar=False)
+            ]
+        self._score_cache = score_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CrossEncoderRerank"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore],
+                           query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+
+        query = query_bundle.query_str
+        scores = [None] * len(nodes)
+        if self._score_cache is not None:
+            scores = [self._score_cache.get(query, node.node) for node in nodes]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [
+                (query, nodes[i].node.get_content(metadata_mode=MetadataMode.EMBED))
+                for i in missing
+            ]
+            for i, score in zip(missing, self._score_pairs(pairs)):
+                scores[i] = score
+                if self._score_cache is not None:
+                    self._score_cache.put(query, nodes[i].node, score)
+
+        for node, score in zip(nodes, scores):
+            node.score = score
+        return sorted(nodes, key=lambda node: -node.score)[:self.top_n]
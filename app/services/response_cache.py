@@ -0,0 +1,242 @@
+"""
+Exact-match cache for generated answers, with request coalescing.
+
+Keys are the normalized question plus the normalized conversation history,
+so only a repeat of the same question in the same context hits. Concurrent
+identical requests (an announcement sending many parents the same question)
+share one in-flight computation instead of each running the pipeline.
+
+Entries are tied to a fingerprint of what this process answers from: the
+version of the loaded index, the system prompt and prices.csv. The index
+is built and prompt.md read once per process, so document and prompt edits
+take effect (and clear the cache) on restart; prices.csv is re-read when it
+changes, and the cache is cleared with it.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.config.settings import PRICES_CSV_PATH, RESPONSE_CACHE_CONFIG
+from app.services.answer_cache import PROMPT_HASH
+from app.services.prompt_builder import PromptBuilder
+from app.services.vector_store import normalize_query
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def answer_sources(knowledge_version: str) -> list:
+    """Index version, prompt hash and prices.csv (mtime, size) answers are currently served from"""
+    try:
+        st = os.stat(PRICES_CSV_PATH)
+        prices = [st.st_mtime_ns, st.st_size]
+    except OSError:
+        # A missing file counts as a state too
+        prices = None
+    return [knowledge_version, PROMPT_HASH, prices]
+
+
+def source_fingerprint(sources: list) -> str:
+    return hashlib.sha256(json.dumps(sources).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """TTL + LRU answer cache keyed by exact (normalized) question and history, with single flight"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, source_check_seconds: float,
+                 sources: Callable[[], list]):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.source_check_seconds = source_check_seconds
+        self.sources = sources
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._fingerprint = None
+        self._generation = 0
+        self._checked = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(query: str, conversation_history: list = None) -> str:
+        """Cache key for a question in its conversation (the UI's trailing copy of the question is ignored)"""
+        history = [
+            [msg["role"], " ".join(msg["content"].lower().split())]
+            for msg in PromptBuilder.history_messages(query, conversation_history)
+        ]
+        payload = json.dumps([normalize_query(query), history], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _check_sources(self) -> None:
+        """Clear the cache when the answer sources changed (checked at most every source_check_seconds)"""
+        now = time.monotonic()
+        if now - self._checked < self.source_check_seconds:
+            return
+        self._checked = now
+        fingerprint = source_fingerprint(self.sources())
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            if self._fingerprint is not None:
+                logger.info(f"Answer sources changed, clearing {len(self._entries)} cached responses")
+                self.invalidations += 1
+            self._fingerprint = fingerprint
+            self._entries.clear()
+            # Computations started before the change must not store their results
+            self._generation += 1
+
+    def _lookup(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if time.monotonic() - created >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        """Return a fresh cached value, or None"""
+        self._check_sources()
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        """Current source generation; pass it to put() for a value computed from here on"""
+        with self._lock:
+            return self._generation
+
+    def put(self, key: str, value, cacheable: Callable[[object], bool] = lambda value: True,
+            generation: Optional[int] = None) -> None:
+        """
+        Store a value computed outside get_or_compute (e.g. a streamed answer)
+
+        Args:
+            generation: generation() when the computation started; the value is
+                dropped if the sources changed since, as in get_or_compute
+        """
+        if not cacheable(value):
+            return
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._store(key, value)
+
+    def _join(self, key: str):
+        """Return (value, future, owner): a cached value, an in-flight future to wait on, or a new future to fill"""
+        self._check_sources()
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            future.generation = self._generation
+            return None, future, True
+
+    def _finish(self, key: str, future: Future, value, cacheable: Callable[[object], bool]) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cacheable(value) and future.generation == self._generation:
+                self._store(key, value)
+        future.set_result(value)
+
+    def _fail(self, key: str, future: Future, error: Exception) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(error)
+
+    def get_or_compute(self, key: str, compute: Callable[[], object],
+                       cacheable: Callable[[object], bool] = lambda value: True):
+        """
+        Return the cached value for key, or compute it once for all concurrent callers
+
+        Args:
+            key: Key from key_for()
+            compute: Produces the value on a miss
+            cacheable: Decides whether a computed value may be stored (it is
+                still handed to the callers waiting on it)
+        """
+        value, future, owner = self._join(key)
+        if future is None:
+            return value
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except Exception as e:
+            self._fail(key, future, e)
+            raise
+        self._finish(key, future, value, cacheable)
+        return value
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[object]],
+                              cacheable: Callable[[object], bool] = lambda value: True):
+        """Async variant of get_or_compute; coalesces with sync callers as well"""
+        value, future, owner = self._join(key)
+        if future is None:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._fail(key, future, e if isinstance(e, Exception) else RuntimeError("computation cancelled"))
+            raise
+        self._finish(key, future, value, cacheable)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations
+            }
+
+
+def create_response_cache(knowledge_version: Callable[[], str]) -> Optional[ResponseCache]:
+    """
+    Build the response cache from RESPONSE_CACHE_CONFIG, or None when disabled
+
+    Args:
+        knowledge_version: Returns the version of the loaded index (VectorStoreService.knowledge_version)
+    """
+    if not RESPONSE_CACHE_CONFIG['ENABLED']:
+        return None
+    return ResponseCache(
+        max_entries=RESPONSE_CACHE_CONFIG['MAX_ENTRIES'],
+        ttl_seconds=RESPONSE_CACHE_CONFIG['TTL_SECONDS'],
+        source_check_seconds=RESPONSE_CACHE_CONFIG['SOURCE_CHECK_SECONDS'],
+        sources=lambda: answer_sources(knowledge_version())
+    )
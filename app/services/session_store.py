@@ -0,0 +1,272 @@
+"""
+Server-side conversation history keyed by session id.
+
+The UI sends only the new message and its session id; the backend keeps the
+turns, with their token counts, and sends the model only the most recent
+turns that fit in HISTORY_TOKEN_BUDGET. Active sessions live in an
+in-process LRU; every turn is also written to SQLite, so sessions evicted
+from the LRU or from before a restart are loaded back on demand.
+
+Once a session grows long, older turns are folded into a running summary
+(app/services/conversation_summary.py); history() then starts with the
+summary and continues with the turns after it.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import SESSION_CONFIG
+from app.utils.tokens import count_tokens
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def fit_to_budget(messages: List[dict], token_budget: int) -> List[dict]:
+    """
+    The most recent messages whose total token count fits the budget
+
+    Messages are kept whole; each may carry a precomputed "tokens" count.
+    """
+    kept = []
+    used = 0
+    for msg in reversed(messages):
+        tokens = msg.get("tokens")
+        if tokens is None:
+            tokens = count_tokens(str(msg.get("content", "")))
+        if used + tokens > token_budget:
+            break
+        used += tokens
+        kept.append({"role": msg.get("role"), "content": msg.get("content")})
+    kept.reverse()
+    return kept
+
+
+class SessionStore:
+    """Conversation turns per session: an LRU of active sessions in front of SQLite"""
+
+    def __init__(self, db_path: str, cache_size: int, token_budget: int):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.token_budget = token_budget
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._init_db()
+        logger.info(f"Session store ready at {db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _init_db(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_turns (
+                    session_id TEXT NOT NULL,
+                    turn INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (session_id, turn)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_summaries (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    covered_turns INTEGER NOT NULL,
+                    summary_tokens INTEGER NOT NULL,
+                    tokens_saved INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def validate(session_id: str) -> str:
+        if not isinstance(session_id, str) or not _SESSION_ID_RE.match(session_id):
+            raise ValueError("Invalid session_id")
+        return session_id
+
+    def _session(self, session_id: str) -> dict:
+        """
+        Turns and summary of a session, loaded from SQLite on an LRU miss (caller holds the lock)
+
+        The summary is None until older turns have been summarized.
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT role, content, tokens FROM session_turns WHERE session_id = ? ORDER BY turn",
+                (session_id,)
+            ).fetchall()
+            summary_row = conn.execute(
+                "SELECT summary, covered_turns, summary_tokens, tokens_saved FROM session_summaries "
+                "WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        summary = None
+        if summary_row is not None:
+            text, covered_turns, summary_tokens, tokens_saved = summary_row
+            summary = {"text": text, "covered_turns": covered_turns,
+                       "tokens": summary_tokens, "tokens_saved": tokens_saved}
+        session = {
+            "turns": [{"role": role, "content": content, "tokens": tokens} for role, content, tokens in rows],
+            "summary": summary
+        }
+        self._sessions[session_id] = session
+        while len(self._sessions) > self.cache_size:
+            self._sessions.popitem(last=False)
+        return session
+
+    def history(self, session_id: str, token_budget: Optional[int] = None) -> List[dict]:
+        """
+        Most recent turns of a session that fit the token budget, oldest first
+
+        Args:
+            session_id: Session id from new_session_id()
+            token_budget: Overrides HISTORY_TOKEN_BUDGET
+
+        Returns:
+            List of {"role", "content"} messages; a system message with the
+            summary of older turns comes first once there is one
+        """
+        self.validate(session_id)
+        with self._lock:
+            session = self._session(session_id)
+            turns = list(session["turns"])
+            summary = session["summary"]
+        budget = self.token_budget if token_budget is None else token_budget
+        return self._prompt_history(turns, summary, budget)[0]
+
+    @staticmethod
+    def _prompt_history(turns: List[dict], summary: Optional[dict], budget: int) -> Tuple[List[dict], int]:
+        """The history messages a prompt carries for these turns and summary, with their token count"""
+        if summary is None:
+            kept = fit_to_budget(turns, budget)
+            return kept, sum(t["tokens"] for t in turns[len(turns) - len(kept):])
+        recent_turns = turns[summary["covered_turns"]:]
+        recent = fit_to_budget(recent_turns, max(0, budget - summary["tokens"]))
+        recent_tokens = sum(t["tokens"] for t in recent_turns[len(recent_turns) - len(recent):])
+        messages = [{"role": "system", "content": SUMMARY_PREFIX + summary["text"]}] + recent
+        return messages, summary["tokens"] + recent_tokens
+
+    def append_exchange(self, session_id: str, question: str, answer: str) -> None:
+        """Store a question and its answer as the next two turns of the session"""
+        self.validate(session_id)
+        new_turns = [
+            {"role": "user", "content": question, "tokens": count_tokens(question)},
+            {"role": "assistant", "content": answer, "tokens": count_tokens(answer)}
+        ]
+        created_at = datetime.now().isoformat()
+        with self._lock:
+            turns = self._session(session_id)["turns"]
+            with closing(self._connect()) as conn:
+                conn.executemany(
+                    "INSERT INTO session_turns (session_id, turn, role, content, tokens, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(session_id, len(turns) + i, t["role"], t["content"], t["tokens"], created_at)
+                     for i, t in enumerate(new_turns)]
+                )
+            turns.extend(new_turns)
+
+    def pending_summary(self, session_id: str, trigger_tokens: int, keep_recent_tokens: int) -> Optional[dict]:
+        """
+        Turns due to be folded into the session summary
+
+        Due once the turns after the current summary exceed trigger_tokens;
+        all but the newest keep_recent_tokens of them are folded, in whole
+        question/answer exchanges.
+
+        Returns:
+            {"summary": previous summary text, "turns": turns to fold,
+            "covered_turns": turn count the new summary will cover}, or None
+        """
+        self.validate(session_id)
+        with self._lock:
+            session = self._session(session_id)
+            turns = list(session["turns"])
+            summary = session["summary"]
+        start = summary["covered_turns"] if summary else 0
+        unsummarized = turns[start:]
+        if sum(t["tokens"] for t in unsummarized) <= trigger_tokens:
+            return None
+        end = len(turns) - len(fit_to_budget(unsummarized, keep_recent_tokens))
+        end -= end % 2  # never split an exchange
+        if end <= start:
+            return None
+        return {"summary": summary["text"] if summary else "", "turns": turns[start:end], "covered_turns": end}
+
+    def save_summary(self, session_id: str, text: str, covered_turns: int) -> int:
+        """
+        Store a summary covering the first covered_turns turns of the session
+
+        Returns:
+            Tokens saved per prompt: the history tokens a prompt carried before
+            this summary (already trimmed to HISTORY_TOKEN_BUDGET) minus the
+            summary and turns it carries after
+        """
+        self.validate(session_id)
+        summary_tokens = count_tokens(text)
+        new_summary = {"text": text, "covered_turns": covered_turns, "tokens": summary_tokens}
+        with self._lock:
+            session = self._session(session_id)
+            turns = session["turns"]
+            tokens_before = self._prompt_history(turns, session["summary"], self.token_budget)[1]
+            tokens_after = self._prompt_history(turns, new_summary, self.token_budget)[1]
+            tokens_saved = tokens_before - tokens_after
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_summaries "
+                    "(session_id, summary, covered_turns, summary_tokens, tokens_saved, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, text, covered_turns, summary_tokens, tokens_saved, datetime.now().isoformat())
+                )
+            session["summary"] = {**new_summary, "tokens_saved": tokens_saved}
+        return tokens_saved
+
+    def stats(self, session_id: str) -> Dict[str, int]:
+        """Turn count, token totals and summary savings of a session"""
+        self.validate(session_id)
+        with self._lock:
+            session = self._session(session_id)
+            turns = list(session["turns"])
+            summary = session["summary"] or {"covered_turns": 0, "tokens": 0, "tokens_saved": 0}
+        return {
+            "turns": len(turns),
+            "tokens": sum(t["tokens"] for t in turns),
+            "summarized_turns": summary["covered_turns"],
+            "summary_tokens": summary["tokens"],
+            "tokens_saved": summary["tokens_saved"]
+        }
+
+
+def create_session_store() -> Optional[SessionStore]:
+    """Build the session store from SESSION_CONFIG, or None when disabled"""
+    if not SESSION_CONFIG['ENABLED']:
+        return None
+    return SessionStore(
+        SESSION_CONFIG['DB_PATH'],
+        cache_size=SESSION_CONFIG['CACHE_SIZE'],
+        token_budget=SESSION_CONFIG['HISTORY_TOKEN_BUDGET']
+    )
@@ -1,16 +1,95 @@
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
-from llama_index.core import Settings
-from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.core import VectorStoreIndex
+from llama_index.core import Settings, StorageContext, load_index_from_storage
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.llms.openai import OpenAI as LlamaOpenAI
+from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core.text_splitter import TokenTextSplitter
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import json
 import logging
-from app.config.settings import OPENAI_API_KEY, VECTOR_STORE_CONFIG, DATA_DIR
+import os
+import re
+import threading
+from app.config.settings import (
+    OPENAI_API_KEY, VECTOR_STORE_CONFIG, DATA_DIR, INDEX_STORAGE_DIR, EMBEDDING_CACHE_CONFIG,
+    INGESTION_MANIFEST
+)
+from app.services import ingestion
+from app.services.embedding_cache import CachedEmbedding, EmbeddingCache
+from app.services.numpy_vector_store import NumpyVectorStore
+from app.services.lexical_index import BM25Index, HybridRetriever
+from app.services.reranker import CrossEncoderRerank
+from app.models.request_context import RequestContext
+from app.utils import metrics
+from app.utils.executor import get_executor
+from app.utils.openai_client import get_http_client, get_async_http_client
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unsynchronized builds
+    fcntl = None
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+def normalize_query(query_text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for cache keys"""
+    return " ".join(re.sub(r"[^\w\s]", " ", query_text.lower()).split())
+
+
+class RerankScoreCache:
+    """
+    Bounded LRU cache of cross-encoder scores
+
+    Keys are (normalized query, node id, node content hash), so an edited
+    chunk never reuses the score of its old text. Lookups are also counted
+    in assistant_rerank_cache_lookups_total at /metrics.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, query_text: str, node) -> tuple:
+        return (normalize_query(query_text), node.node_id, node.hash)
+
+    def get(self, query_text: str, node):
+        key = self._key(query_text, node)
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+            else:
+                self._scores.move_to_end(key)
+                self.hits += 1
+        metrics.RERANK_CACHE_LOOKUPS.labels("miss" if score is None else "hit").inc()
+        return score
+
+    def put(self, query_text: str, node, score: float) -> None:
+        key = self._key(query_text, node)
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+        logger.info("Rerank score cache invalidated")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._scores), "hits": self.hits, "misses": self.misses}
+
+
 class VectorStoreService:
     _instance = None
     _initialized = False
@@ -31,14 +110,33 @@ class VectorStoreService:
         # Set up LlamaIndex
         self.llm = LlamaOpenAI(
             model="gpt-4o-mini",
-            api_key=OPENAI_API_KEY
+            api_key=OPENAI_API_KEY,
+            http_client=get_http_client(),
+            async_http_client=get_async_http_client()
         )
 
         # Set global settings
         Settings.llm = self.llm
+        # Unless another embedding model was installed, swap LlamaIndex's default one
+        # (a plain OpenAIEmbedding) for the same model on the shared connection pool
+        if type(Settings.embed_model) is OpenAIEmbedding:
+            Settings.embed_model = OpenAIEmbedding(
+                api_key=OPENAI_API_KEY,
+                http_client=get_http_client(),
+                async_http_client=get_async_http_client()
+            )
         Settings.chunk_size = VECTOR_STORE_CONFIG['CHUNK_SIZE']
         Settings.chunk_overlap = VECTOR_STORE_CONFIG['CHUNK_OVERLAP']
 
+        # Read chunk embeddings through the shared on-disk cache
+        if EMBEDDING_CACHE_CONFIG['ENABLED'] and not isinstance(Settings.embed_model, CachedEmbedding):
+            embed_model = Settings.embed_model
+            Settings.embed_model = CachedEmbedding(
+                embed_model,
+                EmbeddingCache(EMBEDDING_CACHE_CONFIG['DIR'], embed_model.model_name),
+                query_cache_size=EMBEDDING_CACHE_CONFIG['QUERY_CACHE_SIZE']
+            )
+
         # Initialize text splitter
         self.text_splitter = TokenTextSplitter(
             chunk_size=VECTOR_STORE_CONFIG['CHUNK_SIZE'],
@@ -46,77 +144,313 @@ class VectorStoreService:
         )
 
         # Load and index documents
+        self.rerank_cache = RerankScoreCache(VECTOR_STORE_CONFIG['RERANK_CACHE_SIZE'])
         self.index = self._initialize_index()
 
+        # Apply reranking, coalescing concurrent queries into shared forward passes
+        self.reranker = CrossEncoderRerank(
+            model=VECTOR_STORE_CONFIG['RERANKER_MODEL'],
+            top_n=VECTOR_STORE_CONFIG['TOP_N'],
+            batching=VECTOR_STORE_CONFIG['RERANK_BATCHING'],
+            max_batch_size=VECTOR_STORE_CONFIG['RERANK_MAX_BATCH'],
+            max_wait_ms=VECTOR_STORE_CONFIG['RERANK_MAX_WAIT_MS'],
+            score_cache=self.rerank_cache
+        )
+        self._setup_retrieval()
+        logger.info("Vector store service initialized successfully")
+
+    def _setup_retrieval(self):
+        """Create the retrievers and query engine on top of the current index"""
         # Set up vector retriever
         self.vector_retriever = VectorIndexRetriever(
             index=self.index,
             similarity_top_k=VECTOR_STORE_CONFIG['TOP_K']
         )
-
-        # Apply reranking
-        self.reranker = SentenceTransformerRerank(
-            model=VECTOR_STORE_CONFIG['RERANKER_MODEL'],
-            top_n=VECTOR_STORE_CONFIG['TOP_N']
-        )
+        self.retriever = self._build_retriever()
 
         # Create query engine
         self.query_engine = RetrieverQueryEngine(
-            retriever=self.vector_retriever,
+            retriever=self.retriever,
             node_postprocessors=[self.reranker]
         )
-        logger.info("Vector store service initialized successfully")
+
+    def _build_retriever(self):
+        """Wrap the vector retriever with BM25 rank fusion when hybrid search is enabled"""
+        if not VECTOR_STORE_CONFIG['HYBRID_SEARCH']:
+            return self.vector_retriever
+        # Index the same chunks the vector retriever searches over
+        self.bm25_index = BM25Index(list(self.index.docstore.docs.values()))
+        return HybridRetriever(
+            self.vector_retriever,
+            self.bm25_index,
+            top_k=VECTOR_STORE_CONFIG['TOP_K'],
+            bm25_top_k=VECTOR_STORE_CONFIG['BM25_TOP_K'],
+            rrf_k=VECTOR_STORE_CONFIG['RRF_K']
+        )
 
     def _initialize_index(self):
-        """Initialize the document index"""
+        """
+        Load the persisted index and re-embed only the source files that changed
+
+        The index is stored under INDEX_STORAGE_DIR together with a manifest that
+        records a content hash per source file and a fingerprint of the chunking
+        config. When nothing changed the index is loaded without any embedding calls.
+        """
         try:
-            logger.info(f"Loading documents from: {DATA_DIR}")
-            # Load documents from the data directory
-            documents = SimpleDirectoryReader(DATA_DIR).load_data()
-            logger.info(f"Loaded {len(documents)} documents")
-            
-            # Create index with text splitter
-            logger.info("Creating vector index...")
-            index = VectorStoreIndex.from_documents(
-                documents,
-                text_splitter=self.text_splitter,
-                show_progress=True
-            )
-            logger.info("Vector index created successfully")
+            with self._index_lock():
+                logger.info(f"Scanning documents in: {DATA_DIR}")
+                file_hashes = self._hash_source_files()
+                manifest = self._load_manifest()
+                config_hash = self._config_hash()
+
+                if not manifest or manifest.get("config_hash") != config_hash:
+                    logger.info("No compatible persisted index found, building from scratch")
+                    index = self._build_index(file_hashes, config_hash)
+                else:
+                    try:
+                        index = self._update_index(manifest, file_hashes)
+                    except (FileNotFoundError, ValueError) as e:
+                        logger.warning(f"Persisted index is unusable ({str(e)}), rebuilding")
+                        index = self._build_index(file_hashes, config_hash)
+            # Identifies the indexed content; answer caches are scoped to it
+            self.knowledge_version = hashlib.sha256(
+                json.dumps([config_hash, file_hashes], sort_keys=True).encode("utf-8")
+            ).hexdigest()[:16]
+            # Scores computed against a previous index must not be served again
+            if getattr(self, "rerank_cache", None) is not None:
+                self.rerank_cache.clear()
             return index
         except Exception as e:
             logger.error(f"Error initializing index: {str(e)}")
             raise
 
-    def query(self, query_text: str, conversation_history: list = None) -> str:
-        """Process a query and return the response"""
+    def _build_index(self, file_hashes: dict, config_hash: str) -> VectorStoreIndex:
+        """Embed every source file and persist the resulting index"""
+        documents_by_file = self._load_documents(list(file_hashes))
+        documents = [doc for docs in documents_by_file.values() for doc in docs]
+        logger.info(f"Loaded {len(documents)} documents")
+
+        logger.info("Creating vector index...")
+        index = VectorStoreIndex.from_documents(
+            documents,
+            storage_context=StorageContext.from_defaults(vector_store=self._new_vector_store()),
+            transformations=[self.text_splitter],
+            show_progress=True
+        )
+        logger.info("Vector index created successfully")
+
+        files = {
+            name: {
+                "hash": file_hash,
+                "doc_ids": [doc.doc_id for doc in documents_by_file.get(name, [])]
+            }
+            for name, file_hash in file_hashes.items()
+        }
+        self._persist(index, {"config_hash": config_hash, "files": files})
+        return index
+
+    def _update_index(self, manifest: dict, file_hashes: dict) -> VectorStoreIndex:
+        """Load the persisted index and refresh the entries of changed files"""
+        logger.info(f"Loading persisted index from: {INDEX_STORAGE_DIR}")
+        storage_context = StorageContext.from_defaults(
+            persist_dir=INDEX_STORAGE_DIR,
+            vector_store=self._load_vector_store()
+        )
+        index = load_index_from_storage(
+            storage_context,
+            transformations=[self.text_splitter]
+        )
+
+        files = manifest.get("files", {})
+        changed = [name for name, file_hash in file_hashes.items()
+                   if files.get(name, {}).get("hash") != file_hash]
+        removed = [name for name in files if name not in file_hashes]
+
+        if not changed and not removed:
+            logger.info("Persisted index is up to date")
+            return index
+
+        logger.info(f"Re-indexing {len(changed)} changed and removing {len(removed)} deleted files")
+        for name in changed + removed:
+            for doc_id in files.get(name, {}).get("doc_ids", []):
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            files.pop(name, None)
+
+        documents_by_file = self._load_documents(changed)
+        for name in changed:
+            documents = documents_by_file.get(name, [])
+            for doc in documents:
+                index.insert(doc)
+            files[name] = {
+                "hash": file_hashes[name],
+                "doc_ids": [doc.doc_id for doc in documents]
+            }
+
+        manifest["files"] = files
+        self._persist(index, manifest)
+        return index
+
+    def _new_vector_store(self):
+        """Create an empty vector store for the configured backend"""
+        if VECTOR_STORE_CONFIG['VECTOR_STORE_BACKEND'] == 'numpy':
+            return NumpyVectorStore(quantization=VECTOR_STORE_CONFIG['QUANTIZATION'])
+        # None lets LlamaIndex use its default SimpleVectorStore
+        return None
+
+    def _load_vector_store(self):
+        """Load the persisted vector store for the configured backend"""
+        if VECTOR_STORE_CONFIG['VECTOR_STORE_BACKEND'] == 'numpy':
+            return NumpyVectorStore.from_persist_path(
+                os.path.join(INDEX_STORAGE_DIR, "default__vector_store.json")
+            )
+        return None
+
+    def _load_documents(self, file_names: list) -> dict:
+        """Load the given source files with their manifest loaders, grouped by file name"""
+        return ingestion.load_documents(file_names, DATA_DIR)
+
+    def _hash_source_files(self) -> dict:
+        """Return a content hash for every file selected by the ingestion manifest"""
+        file_hashes = {}
+        for name, _ in ingestion.list_source_files(DATA_DIR):
+            digest = hashlib.sha256()
+            with open(os.path.join(DATA_DIR, name), "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            file_hashes[name] = digest.hexdigest()
+        return file_hashes
+
+    def _config_hash(self) -> str:
+        """Fingerprint of the settings that change how documents are chunked and embedded"""
+        config = {
+            "chunk_size": VECTOR_STORE_CONFIG['CHUNK_SIZE'],
+            "chunk_overlap": VECTOR_STORE_CONFIG['CHUNK_OVERLAP'],
+            "embed_model": getattr(Settings.embed_model, "model_name", None),
+            "backend": VECTOR_STORE_CONFIG['VECTOR_STORE_BACKEND'],
+            "quantization": VECTOR_STORE_CONFIG['QUANTIZATION'],
+            "ingestion": INGESTION_MANIFEST
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(INDEX_STORAGE_DIR, "manifest.json")
+
+    def _load_manifest(self) -> dict:
+        """Read the index manifest, or None if there is no usable persisted index"""
         try:
-            logger.info(f"Processing query: {query_text[:50]}...")
-            # Get relevant context from the index
-            response = self.query_engine.query(query_text)
-            
-            # Format conversation history if available
-            history_context = ""
-            if conversation_history:
-                logger.info(f"Including conversation history of {len(conversation_history)} messages")
-                history_context = "Previous conversation:\n"
-                for msg in conversation_history:
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    history_context += f"{role}: {msg['content']}\n"
-                history_context += "\n"
-            
-            # Construct prompt with retrieved context and conversation history
-            augmented_prompt = f"""Based on the following context, conversation history, and your knowledge as an AI assistant, please answer the question.
-            If the answer cannot be found in the context, say 'I am not sure, but you can contact our support at 718-971-9914 or newturbony@gmail.com.'
-            
-            {history_context}
-            Context: {response.response}
-            
-            Question: {query_text}
-            """
-            
-            return augmented_prompt
-            
-        except Exception as e:
-            logger.error(f"Error in query processing: {str(e)}")
-            return "I apologize, but I encountered an error processing your request. Please try again." 
\ No newline at end of file
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _persist(self, index: VectorStoreIndex, manifest: dict) -> None:
+        """Persist the index first, then atomically replace the manifest"""
+        os.makedirs(INDEX_STORAGE_DIR, exist_ok=True)
+        index.storage_context.persist(persist_dir=INDEX_STORAGE_DIR)
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+        logger.info(f"Persisted vector index to: {INDEX_STORAGE_DIR}")
+
+    @contextmanager
+    def _index_lock(self):
+        """Serialize index builds so concurrent workers embed the corpus only once"""
+        os.makedirs(INDEX_STORAGE_DIR, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(INDEX_STORAGE_DIR, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def embed_query(self, query_text: str) -> list:
+        """Embed a query with the configured (cached) embedding model"""
+        return Settings.embed_model.get_query_embedding(query_text)
+
+    def retrieve(self, query_text: str, ctx: RequestContext = None) -> list:
+        """
+        Retrieve and rerank the context chunks for a query without any LLM call
+
+        Args:
+            query_text: The user's question
+            ctx: Optional request context; chunks already retrieved (or being
+                prefetched) for this request are reused, new ones are stored on it
+
+        Returns:
+            List of dicts with the chunk text, rerank score and source metadata,
+            ordered from most to least relevant
+        """
+        if ctx is not None and ctx.retrieval is not None:
+            return ctx.retrieval.result()
+        return self._retrieve(query_text, ctx)
+
+    def prefetch(self, query_text: str, ctx: RequestContext, executor) -> None:
+        """Start retrieval on the executor; a later retrieve() with the same ctx waits for it"""
+        if ctx.nodes is None and ctx.retrieval is None and VECTOR_STORE_CONFIG['RESPONSE_MODE'] == 'retrieval':
+            ctx.retrieval = executor.submit(self._retrieve, query_text, ctx)
+
+    def _retrieve(self, query_text: str, ctx: RequestContext = None) -> list:
+        if ctx is not None and ctx.nodes is not None:
+            return ctx.nodes
+        if ctx is None:
+            ctx = RequestContext(query=query_text)
+        with ctx.stage("retrieval"):
+            nodes = self.retriever.retrieve(query_text)
+        with ctx.stage("rerank"):
+            nodes = self.reranker.postprocess_nodes(nodes, query_str=query_text)
+        ctx.nodes = [
+            {
+                "node_id": node.node.node_id,
+                "text": node.node.get_content(),
+                "score": node.score,
+                "source": node.node.metadata.get("file_name"),
+                "metadata": dict(node.node.metadata)
+            }
+            for node in nodes
+        ]
+        return ctx.nodes
+
+    def format_context(self, chunks: list) -> str:
+        """Format retrieved chunks as a numbered context block"""
+        sections = []
+        for i, chunk in enumerate(chunks, start=1):
+            score = f"{chunk['score']:.3f}" if chunk.get("score") is not None else "n/a"
+            sections.append(f"[{i}] (source: {chunk.get('source') or 'unknown'}, score: {score})\n{chunk['text']}")
+        return "\n\n".join(sections)
+
+    def get_context(self, query_text: str, ctx: RequestContext = None) -> str:
+        """Return the context text for a query according to RESPONSE_MODE"""
+        if VECTOR_STORE_CONFIG['RESPONSE_MODE'] == 'synthesis':
+            # Legacy path: LlamaIndex synthesizes an intermediate answer with the LLM
+            if ctx is None:
+                return self.query_engine.query(query_text).response
+            with ctx.stage("synthesis"):
+                return self.query_engine.query(query_text).response
+        return self.format_context(self.retrieve(query_text, ctx))
+
+    async def aembed_query(self, query_text: str) -> list:
+        """Embed a query without blocking the event loop (fills the shared query LRU)"""
+        return await Settings.embed_model.aget_query_embedding(query_text)
+
+    async def aretrieve(self, query_text: str, ctx: RequestContext = None) -> list:
+        """
+        Async variant of retrieve for the ASGI entry point
+
+        The query embedding is awaited first, so the CPU-bound search and
+        reranking that follow run on the pipeline executor without network I/O.
+        """
+        if ctx is not None and ctx.retrieval is not None:
+            return await asyncio.wrap_future(ctx.retrieval)
+        await self.aembed_query(query_text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), self._retrieve, query_text, ctx)
+
+    async def aget_context(self, query_text: str, ctx: RequestContext = None) -> str:
+        """Async variant of get_context"""
+        if VECTOR_STORE_CONFIG['RESPONSE_MODE'] == 'synthesis':
+            return (await self.query_engine.aquery(query_text)).response
+        return self.format_context(await self.aretrieve(query_text, ctx))
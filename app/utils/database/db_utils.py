@@ -7,10 +7,53 @@ Provides database initialization and connection functions.
 import os
 import sqlite3
 import logging
+import time
 from app.config.settings import DB_PATH
+from app.utils.metrics import DB_QUERY_SECONDS
 
 logger = logging.getLogger(__name__)
 
+
+def _statement_type(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records each statement's execution time in DB_QUERY_SECONDS"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_QUERY_SECONDS.labels(_statement_type(sql)).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_QUERY_SECONDS.labels(_statement_type(sql)).observe(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are TimedCursors"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """sqlite3.connect with statement timings exported at /metrics"""
+    return sqlite3.connect(db_path, factory=TimedConnection)
+
 def init_db():
     """
     Initialize the database by creating necessary tables if they don't exist.
@@ -67,7 +110,7 @@ def get_db_connection():
         sqlite3.Connection: A connection to the database
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect(DB_PATH)
         conn.row_factory = sqlite3.Row  # This enables column access by name
         return conn
     except Exception as e:
@@ -0,0 +1,26 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.config.settings import PIPELINE_CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool used to run independent request stages concurrently"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=PIPELINE_CONFIG['MAX_WORKERS'],
+                    thread_name_prefix="pipeline"
+                )
+                logger.info(f"Pipeline executor started with {PIPELINE_CONFIG['MAX_WORKERS']} workers")
+    return _executor
@@ -0,0 +1,234 @@
+"""
+In-process metrics exported in the Prometheus text format at GET /metrics.
+
+A small subset of the prometheus_client API (Counter and Histogram with
+.labels()), kept dependency-free. Updating a metric is one dict lookup and
+a lock-protected add, so instrumentation stays on in production.
+
+Request-level numbers come from the RequestContext: record_request() turns
+its stage timings into histograms and its per-call-site token usage into
+token and cost counters once the request is done.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+from app.config.settings import METRICS_CONFIG, MODEL_CONFIG
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[tuple, object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values, **labelvalues):
+        """Child metric for one combination of label values"""
+        if labelvalues:
+            values = tuple(labelvalues[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(dict(self._children).items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self, name: str, labelnames, key) -> List[str]:
+        return [f"{name}{_label_text(labelnames, key)} {_number(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name: str, labelnames, key) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_label_text(labelnames, key, ('le', _number(bound)))} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labelnames, key)} {_number(total)}")
+        lines.append(f"{name}_count{_label_text(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed upper bounds"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    "assistant_stage_duration_seconds",
+    "Wall time of /query pipeline stages (intent, retrieval, rerank, price_data, generation, ...)",
+    ["stage"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "assistant_http_request_duration_seconds",
+    "Flask request handling time by route",
+    ["method", "route", "status"]
+)
+OPENAI_TOKENS = Counter(
+    "assistant_openai_tokens_total",
+    "OpenAI tokens by call site; kind is prompt, cached_prompt or completion",
+    ["call_site", "kind"]
+)
+OPENAI_COST = Counter(
+    "assistant_openai_cost_usd_total",
+    "Estimated OpenAI spend in USD by call site (METRICS_CONFIG prices)",
+    ["call_site"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "assistant_db_query_duration_seconds",
+    "SQLite statement execution time by statement type",
+    ["statement"]
+)
+SMTP_SEND_SECONDS = Histogram(
+    "assistant_smtp_send_duration_seconds",
+    "Time to connect, authenticate and send one email",
+    ["outcome"]
+)
+SESSION_SUMMARIES = Counter(
+    "assistant_session_summaries_total",
+    "Background conversation summaries by outcome",
+    ["outcome"]
+)
+SESSION_TOKENS_SAVED = Histogram(
+    "assistant_session_summary_tokens_saved",
+    "History tokens saved per prompt by a session's summary versus the budget-trimmed history before it",
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+RERANK_CACHE_LOOKUPS = Counter(
+    "assistant_rerank_cache_lookups_total",
+    "Cross-encoder score cache lookups by outcome (hit or miss)",
+    ["outcome"]
+)
+
+
+def token_cost(usage: dict) -> float:
+    """Estimated USD cost of a call site's accumulated usage"""
+    prices = METRICS_CONFIG['PRICE_PER_1M_TOKENS'].get(MODEL_CONFIG['MODEL_NAME'])
+    if prices is None:
+        return 0.0
+    cached = usage.get("cached_tokens", 0)
+    return ((usage["prompt_tokens"] - cached) * prices['input']
+            + cached * prices['cached_input']
+            + usage["completion_tokens"] * prices['output']) / 1_000_000
+
+
+def record_request(ctx) -> None:
+    """Export a finished request's stage timings and token usage"""
+    if not METRICS_CONFIG['ENABLED']:
+        return
+    for stage, ms in dict(ctx.timings).items():
+        STAGE_SECONDS.labels(stage).observe(ms / 1000)
+    for call_site, usage in dict(ctx.token_usage).items():
+        cached = usage.get("cached_tokens", 0)
+        OPENAI_TOKENS.labels(call_site, "prompt").inc(usage["prompt_tokens"])
+        OPENAI_TOKENS.labels(call_site, "cached_prompt").inc(cached)
+        OPENAI_TOKENS.labels(call_site, "completion").inc(usage["completion_tokens"])
+        OPENAI_COST.labels(call_site).inc(token_cost(usage))
@@ -0,0 +1,102 @@
+"""
+Process-wide OpenAI clients sharing one pooled HTTP connection pool.
+
+ChatService, IntentDetectionService and the LlamaIndex LLM and embedding
+model all send requests through the same httpx pool. One chat turn then
+reuses warm keep-alive connections (and TLS sessions) instead of each
+service opening its own, and the idle expiry is long enough to survive the
+pause between a user's messages. HTTP/2 is used when the h2 package is
+installed, multiplexing concurrent calls over a single connection.
+
+The async client is bound to the event loop that first uses it (the ASGI
+server's loop).
+"""
+
+import importlib.util
+import logging
+import threading
+from typing import Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from app.config.settings import OPENAI_CLIENT_CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def http2_enabled() -> bool:
+    return OPENAI_CLIENT_CONFIG['HTTP2'] and importlib.util.find_spec("h2") is not None
+
+
+def default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_CLIENT_CONFIG['TIMEOUT_SECONDS'],
+                         connect=OPENAI_CLIENT_CONFIG['CONNECT_TIMEOUT_SECONDS'])
+
+
+def timeout_for(call_site: str) -> httpx.Timeout:
+    """Per-call timeout for a call site in OPENAI_CLIENT_CONFIG['CALL_TIMEOUTS']"""
+    seconds = OPENAI_CLIENT_CONFIG['CALL_TIMEOUTS'].get(call_site, OPENAI_CLIENT_CONFIG['TIMEOUT_SECONDS'])
+    return httpx.Timeout(seconds, connect=OPENAI_CLIENT_CONFIG['CONNECT_TIMEOUT_SECONDS'])
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_CLIENT_CONFIG['MAX_CONNECTIONS'],
+        max_keepalive_connections=OPENAI_CLIENT_CONFIG['MAX_KEEPALIVE_CONNECTIONS'],
+        keepalive_expiry=OPENAI_CLIENT_CONFIG['KEEPALIVE_EXPIRY_SECONDS']
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """The shared sync connection pool"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_limits(), timeout=default_timeout(), http2=http2_enabled())
+                logger.info(f"OpenAI connection pool created (http2={http2_enabled()}, "
+                            f"max_connections={OPENAI_CLIENT_CONFIG['MAX_CONNECTIONS']})")
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """The shared async connection pool"""
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=default_timeout(),
+                                                       http2=http2_enabled())
+    return _async_http_client
+
+
+def get_client() -> OpenAI:
+    """The shared sync OpenAI client"""
+    global _client
+    if _client is None:
+        http_client = get_http_client()
+        with _lock:
+            if _client is None:
+                _client = OpenAI(http_client=http_client, timeout=default_timeout(),
+                                 max_retries=OPENAI_CLIENT_CONFIG['MAX_RETRIES'])
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """The shared async OpenAI client"""
+    global _async_client
+    if _async_client is None:
+        http_client = get_async_http_client()
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(http_client=http_client, timeout=default_timeout(),
+                                            max_retries=OPENAI_CLIENT_CONFIG['MAX_RETRIES'])
+    return _async_client
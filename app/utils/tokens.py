@@ -0,0 +1,51 @@
+import logging
+import math
+import re
+import threading
+
+from app.config.settings import MODEL_CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# CJK ideographs and full-width punctuation
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """The model's tiktoken encoding, or None when tiktoken or its encoding file is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    try:
+                        _encoding = tiktoken.encoding_for_model(MODEL_CONFIG['MODEL_NAME'])
+                    except KeyError:
+                        _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable ({type(e).__name__}), estimating token counts")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough count without a tokenizer: ~1 token per CJK character, ~4 characters per token otherwise"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens text takes in the chat model's prompt"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
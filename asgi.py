@@ -0,0 +1,238 @@
+"""
+ASGI entry point for production serving.
+
+/query and /query/stream are served by async handlers that await the OpenAI
+API instead of holding a thread per request; every other route (appointments,
+SQLite, SMTP) is the Flask app from app.py, run on a bounded thread pool.
+
+Run with:
+    uvicorn asgi:application --host 127.0.0.1 --port 5000
+"""
+
+import importlib.util
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app.config.settings import MODEL_CONFIG, SERVING_CONFIG
+from app.models.request_context import RequestContext
+from app.services.answer_cache import is_context_free
+from app.services.registry import ServiceUnavailable
+from app.utils.database.db_utils import init_db
+from app.utils import metrics
+
+# app.py shares its name with the app/ package, so load it by path. Importing it
+# registers the services and starts the background warm-up.
+_spec = importlib.util.spec_from_file_location(
+    "flask_app", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+)
+flask_app = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(flask_app)
+
+services = flask_app.services
+logger = logging.getLogger("asgi")
+
+
+async def get_service(name: str):
+    """Return a warm service without blocking the event loop while it warms up"""
+    if services.is_ready([name]):
+        return services.get(name)
+    return await run_in_threadpool(services.get, name, SERVING_CONFIG['READY_TIMEOUT_SECONDS'])
+
+
+def service_unavailable(e: ServiceUnavailable) -> JSONResponse:
+    logger.warning(f"Service unavailable: {str(e)}")
+    return JSONResponse(
+        {"error": str(e), "services": services.status()},
+        status_code=503,
+        headers={"Retry-After": str(SERVING_CONFIG['RETRY_AFTER_SECONDS'])}
+    )
+
+
+async def abuild_answer(ctx: RequestContext, chat_service) -> dict:
+    """Async counterpart of app.build_answer"""
+    structured = None
+    if MODEL_CONFIG['GENERATION_MODE'] == 'structured':
+        structured = await chat_service.aget_structured_completion(ctx.query, ctx.conversation_history, ctx)
+        intent_data = ctx.intent
+    else:
+        intent_data = await chat_service.aget_hybrid_intent(ctx.query, ctx.conversation_history, ctx)
+    logger.info(f"Intent detected: {intent_data.get('intent')} with confidence {intent_data.get('confidence', 0)}")
+
+    if flask_app.is_appointment(intent_data, chat_service):
+        ctx.cancel_pending()
+        return flask_app.appointment_response(intent_data.get("intent"))
+
+    if structured is not None:
+        answer = structured["answer"]
+    else:
+        answer = await chat_service.aget_completion(ctx.query, ctx.conversation_history, ctx)
+    return {"answer": answer, "intent": intent_data.get("intent", "general_query")}
+
+
+async def prepare(request: Request):
+    """
+    Parse a /query body and resolve the services
+
+    Returns (ctx, (data, session_id, direct, chat_service, answer_cache, cache_scope))
+    or (None, error response). direct is the template answer of a direct price
+    lookup; the services are not needed (and not waited for) then.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data or 'query' not in data:
+        logger.warning("No query provided")
+        return None, JSONResponse({"error": "No query provided"}, status_code=400)
+
+    try:
+        # The session store reads SQLite on an LRU miss
+        session_id, conversation_history = await run_in_threadpool(flask_app.resolve_history, data)
+    except ValueError as e:
+        return None, JSONResponse({"error": str(e)}, status_code=400)
+    ctx = RequestContext(query=data.get("query").lower().strip(), conversation_history=conversation_history)
+    direct = flask_app.direct_price_answer(ctx)
+    if direct is not None:
+        return ctx, (data, session_id, direct, None, None, None)
+    try:
+        # In warm-up order, so a request never builds a component the warm-up thread is building
+        vector_store = await get_service("vector_store")
+        await get_service("intent_detector")
+        chat_service = await get_service("chat")
+        answer_cache = await get_service("answer_cache")
+    except ServiceUnavailable as e:
+        return None, service_unavailable(e)
+
+    try:
+        # Fills the query-embedding LRU, so the cache lookup, the local intent
+        # classifier and the retrieval threads below never wait on the embedding API
+        await vector_store.aembed_query(ctx.query)
+    except Exception as e:
+        logger.error(f"Error embedding query: {str(e)}")
+
+    # The answer cache embeds the query (an LRU hit after the call above) and scans its
+    # entries, so get/put run on the thread pool like the session store calls
+    cache_scope = None
+    if answer_cache is not None and is_context_free(ctx.query, ctx.conversation_history):
+        cache_scope = answer_cache.scope_for(vector_store.knowledge_version)
+    return ctx, (data, session_id, None, chat_service, answer_cache, cache_scope)
+
+
+async def query(request: Request):
+    ctx, resolved = await prepare(request)
+    if ctx is None:
+        return resolved
+    data, session_id, direct, chat_service, answer_cache, cache_scope = resolved
+    try:
+        with ctx.stage("total"):
+            result = direct
+            if result is None and cache_scope is not None:
+                result = await run_in_threadpool(answer_cache.get, ctx.query, cache_scope,
+                                                 refresh=flask_app.refresher(ctx), cacheable=flask_app.is_cacheable)
+            if result is None:
+                result = await abuild_answer(ctx, chat_service)
+                if cache_scope is not None:
+                    await run_in_threadpool(answer_cache.put, ctx.query, cache_scope, result,
+                                            cacheable=flask_app.is_cacheable)
+        await run_in_threadpool(flask_app.remember_exchange, session_id, data, result)
+        logger.info(f"Request {ctx.request_id}: {ctx.server_timing()}, {ctx.total_tokens()} tokens ({ctx.cached_tokens()} cached)")
+        metrics.record_request(ctx)
+        if session_id is not None:
+            result = {**result, "session_id": session_id}
+        headers = {"Server-Timing": ctx.server_timing()} if SERVING_CONFIG['TIMING_HEADER'] else None
+        return JSONResponse(result, headers=headers)
+    except Exception as e:
+        logger.error(f"Error in answer_query: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def query_stream(request: Request):
+    ctx, resolved = await prepare(request)
+    if ctx is None:
+        return resolved
+    data, session_id, direct, chat_service, answer_cache, cache_scope = resolved
+    sse_event = flask_app.sse_event
+    session = {"session_id": session_id} if session_id is not None else {}
+
+    async def generate():
+        start = time.perf_counter()
+        result = None
+        try:
+            result = direct
+            if result is None and cache_scope is not None:
+                result = await run_in_threadpool(answer_cache.get, ctx.query, cache_scope,
+                                                 refresh=flask_app.refresher(ctx), cacheable=flask_app.is_cacheable)
+            if result is None and MODEL_CONFIG['GENERATION_MODE'] == 'structured':
+                result = await abuild_answer(ctx, chat_service)
+                if cache_scope is not None:
+                    await run_in_threadpool(answer_cache.put, ctx.query, cache_scope, result,
+                                            cacheable=flask_app.is_cacheable)
+            if result is not None:
+                yield sse_event("intent", {"intent": result["intent"], **session})
+                yield sse_event("token", {"text": result["answer"]})
+                yield sse_event("done", {"intent": result["intent"], **session})
+                return
+
+            intent_data = await chat_service.aget_hybrid_intent(ctx.query, ctx.conversation_history, ctx)
+            intent = intent_data.get("intent", "general_query")
+            yield sse_event("intent", {"intent": intent, "confidence": intent_data.get("confidence", 0), **session})
+
+            if flask_app.is_appointment(intent_data, chat_service):
+                ctx.cancel_pending()
+                result = flask_app.appointment_response(intent)
+                yield sse_event("token", {"text": result["answer"]})
+            else:
+                parts = []
+                async for delta in chat_service.astream_completion(ctx.query, ctx.conversation_history, ctx):
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+                result = {"answer": "".join(parts), "intent": intent}
+                if flask_app.ERROR_RESPONSE in parts:
+                    result["answer"] = flask_app.ERROR_RESPONSE
+            yield sse_event("done", {"intent": intent, **session})
+            if cache_scope is not None:
+                await run_in_threadpool(answer_cache.put, ctx.query, cache_scope, result,
+                                        cacheable=flask_app.is_cacheable)
+        except Exception as e:
+            logger.error(f"Error in stream_query: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+            result = None
+        finally:
+            ctx.timings["total"] = (time.perf_counter() - start) * 1000
+            if session_id is not None and result is not None:
+                await run_in_threadpool(flask_app.remember_exchange, session_id, data, result)
+            logger.info(f"Request {ctx.request_id}: {ctx.server_timing()}, {ctx.total_tokens()} tokens ({ctx.cached_tokens()} cached)")
+            metrics.record_request(ctx)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(init_db)
+    logger.info("Database initialized")
+    yield
+
+
+application = Starlette(
+    routes=[
+        Route("/query", query, methods=["POST"]),
+        Route("/query/stream", query_stream, methods=["POST"]),
+        # Everything else, including the SQLite and SMTP routes, runs in Flask on a bounded pool
+        Mount("/", app=WSGIMiddleware(flask_app.app, workers=SERVING_CONFIG['WSGI_WORKERS'])),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for the New Turbo Education assistant backend.
+Run from the project root, e.g. `python -m benchmarks.vector_store`.
+"""
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare the multi-call pipeline with single-call structured generation.
+
+Usage:
+    python -m benchmarks.generation_mode [--rounds 3]
+
+Runs the same questions through ChatService in both GENERATION_MODE settings
+and reports latency, model calls and tokens per question, including prompt
+tokens served from the provider's prefix cache. Calls the OpenAI API.
+"""
+
+import argparse
+import statistics
+import time
+
+from app.models.request_context import RequestContext
+from app.services.chat import ChatService
+
+QUESTIONS = [
+    "what courses do you offer for high school students?",
+    "how much is sat 1on1?",
+    "do you have online classes?",
+    "你们的老师有什么背景？",
+    "shsat一对二多少钱",
+    "can you help with college essays?",
+]
+
+
+def run_pipeline(chat_service: ChatService, ctx: RequestContext) -> str:
+    intent_data = chat_service.get_hybrid_intent(ctx.query, ctx.conversation_history, ctx)
+    chat_service.get_completion(ctx.query, ctx.conversation_history, ctx)
+    return intent_data.get("intent")
+
+
+def run_structured(chat_service: ChatService, ctx: RequestContext) -> str:
+    return chat_service.get_structured_completion(ctx.query, ctx.conversation_history, ctx)["intent"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    chat_service = ChatService()
+    intents = {}
+    for name, run in (("pipeline", run_pipeline), ("structured", run_structured)):
+        latencies, tokens, cached, calls = [], [], [], []
+        for _ in range(args.rounds):
+            for question in QUESTIONS:
+                ctx = RequestContext(query=question)
+                start = time.perf_counter()
+                intents.setdefault(question, {})[name] = run(chat_service, ctx)
+                latencies.append((time.perf_counter() - start) * 1000)
+                tokens.append(ctx.total_tokens())
+                cached.append(ctx.cached_tokens())
+                calls.append(len(ctx.token_usage))
+        print(f"{name:10s} p50 {statistics.median(latencies):8.1f} ms  max {max(latencies):8.1f} ms  "
+              f"tokens/question {statistics.mean(tokens):7.1f} ({statistics.mean(cached):7.1f} cached)  "
+              f"model call sites/question {statistics.mean(calls):.2f}")
+
+    agree = sum(labels["pipeline"] == labels["structured"] for labels in intents.values())
+    print(f"intent agreement: {agree}/{len(intents)}")
+    for question, labels in intents.items():
+        if labels["pipeline"] != labels["structured"]:
+            print(f"  {question}: pipeline={labels['pipeline']} structured={labels['structured']}")
+
+
+if __name__ == "__main__":
+    main()
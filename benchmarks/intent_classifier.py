@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare the local embedding intent classifier with the LLM intent call on held-out queries.
+
+Usage:
+    python -m benchmarks.intent_classifier [--margin 0.04]
+
+Calls the OpenAI API (one embedding and one chat completion per query).
+"""
+
+import argparse
+import statistics
+import time
+
+from app.services.intent_detection import IntentDetectionService
+
+# Held-out queries (not in app/config/intent_exemplars.json) with their expected intent
+EVAL_QUERIES = [
+    ("Can I book a session for next Tuesday?", "schedule_appointment"),
+    ("I'd like my kid to try a class first", "schedule_appointment"),
+    ("Are there any slots open this weekend?", "schedule_appointment"),
+    ("Sign me up for SHSAT prep please", "schedule_appointment"),
+    ("I want to come in and talk to someone about SAT", "schedule_appointment"),
+    ("我想给女儿预约周日的课", "schedule_appointment"),
+    ("下周可以安排试听吗", "schedule_appointment"),
+    ("能不能约个时间来咨询", "schedule_appointment"),
+    ("What does ACT tutoring cost?", "price_query"),
+    ("How much is a 10 hour package?", "price_query"),
+    ("Are group classes cheaper than one on one?", "price_query"),
+    ("What's the fee for high school ESL?", "price_query"),
+    ("Tuition for primary school writing?", "price_query"),
+    ("SHSAT一对二多少钱", "price_query"),
+    ("高中ESL的学费", "price_query"),
+    ("上课怎么收费的", "price_query"),
+    ("Do you offer summer programs?", "general_query"),
+    ("What subjects do you teach?", "general_query"),
+    ("How many students are in a class?", "general_query"),
+    ("Is parking available near your office?", "general_query"),
+    ("What is your refund policy?", "general_query"),
+    ("Do you help with essays for college?", "general_query"),
+    ("你们有暑期班吗", "general_query"),
+    ("老师有什么资质", "general_query"),
+    ("在线上课效果怎么样", "general_query"),
+    ("thanks!", "general_query"),
+]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--margin", type=float, default=None,
+                        help="override INTENT_CLASSIFIER_CONFIG['MARGIN_THRESHOLD']")
+    args = parser.parse_args()
+
+    detector = IntentDetectionService()
+    classifier = detector.local_classifier
+    if classifier is None:
+        raise SystemExit("Local intent classifier is disabled in INTENT_CLASSIFIER_CONFIG")
+    margin_threshold = args.margin if args.margin is not None else detector.margin_threshold
+
+    embed_ms, local_ms, llm_ms = [], [], []
+    local_correct = llm_correct = hybrid_correct = agree = deferred = 0
+    for query, expected in EVAL_QUERIES:
+        start = time.perf_counter()
+        vector = classifier.embed_query(query)
+        embed_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        local = classifier.classify_vector(vector)
+        local_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        llm = detector.detect_intent_llm(query)
+        llm_ms.append((time.perf_counter() - start) * 1000)
+
+        confident = local["margin"] >= margin_threshold
+        deferred += not confident
+        local_correct += local["intent"] == expected
+        llm_correct += llm.get("intent") == expected
+        agree += local["intent"] == llm.get("intent")
+        hybrid_correct += (local["intent"] if confident else llm.get("intent")) == expected
+        flag = "" if local["intent"] == expected else "  <-- local miss"
+        print(f"{expected:22s} local={local['intent']:22s} margin={local['margin']:.3f} "
+              f"llm={llm.get('intent')}{flag}  {query}")
+
+    total = len(EVAL_QUERIES)
+    print(f"\n{total} queries, margin threshold {margin_threshold}")
+    print(f"accuracy  local: {local_correct / total:.2%}  llm: {llm_correct / total:.2%}  "
+          f"local+llm fallback: {hybrid_correct / total:.2%}")
+    print(f"local/llm agreement: {agree / total:.2%}, deferred to llm: {deferred / total:.2%}")
+    for name, values in (("embedding", embed_ms), ("local classify", local_ms), ("llm call", llm_ms)):
+        print(f"{name:15s} p50 {percentile(values, 0.5):9.3f} ms  p95 {percentile(values, 0.95):9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Load-test /query against a stand-in OpenAI API to compare the Flask and ASGI servers.
+
+Usage:
+    # 1. Stand-in OpenAI API with a fixed completion latency (no API cost)
+    python -m benchmarks.load_query stub --port 9100 --latency 1.0
+
+    # 2. Server under test, pointed at the stand-in (either one)
+    export OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_BASE=http://127.0.0.1:9100/v1
+    python app.py                                      # Flask dev server
+    uvicorn asgi:application --port 5000               # ASGI
+
+    # 3. Load: many concurrent chat requests, optionally sampling the server's thread count
+    python -m benchmarks.load_query run --url http://127.0.0.1:5000 --concurrency 200 --requests 1000 --pid <server pid>
+
+Every request uses a distinct question, so the answer cache does not absorb the load.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import statistics
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "what courses do you offer for high school students",
+    "do you have online classes",
+    "what is the class size for shsat",
+    "can you help with college essays",
+    "你们的老师有什么背景",
+    "what are your business hours",
+]
+
+
+def create_stub_app(latency: float, embed_latency: float):
+    """A minimal OpenAI-compatible API that sleeps instead of generating"""
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    async def chat_completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        usage = {"prompt_tokens": 500, "completion_tokens": 50, "total_tokens": 550}
+        if body.get("response_format"):
+            content = json.dumps({"intent": "general_query", "confidence": 0.9,
+                                  "explanation": "stub", "answer": "Stub answer."})
+        else:
+            content = "Stub answer from the stand-in OpenAI server."
+        if body.get("stream"):
+            async def events():
+                for word in content.split(" "):
+                    chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                             "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                final = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return JSONResponse({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    async def embeddings(request):
+        body = await request.json()
+        await asyncio.sleep(embed_latency)
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dim = body.get("dimensions") or 1536
+        data = []
+        for i, text in enumerate(texts):
+            seed = np.frombuffer(hashlib.sha256(str(text).encode("utf-8")).digest(), dtype=np.uint8)
+            vector = (np.resize(seed, dim).astype(np.float32) - 128) / 128
+            # The OpenAI client asks for base64, which is far cheaper to encode than a float list
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return JSONResponse({"object": "list", "data": data, "model": body["model"],
+                             "usage": {"prompt_tokens": 10, "total_tokens": 10}})
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+    ])
+
+
+def thread_count(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def run_load(url: str, concurrency: int, requests: int, pid: int = None, timeout: float = 120.0):
+    latencies, statuses = [], Counter()
+    counter = iter(range(requests))
+    peak_threads = 0
+
+    async def worker(client):
+        for i in counter:
+            question = f"{QUESTIONS[i % len(QUESTIONS)]} ({i})"
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/query", json={"query": question, "conversation_history": []})
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, thread_count(pid))
+            await asyncio.sleep(0.1)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        sampler = asyncio.create_task(sample_threads()) if pid else None
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        if sampler:
+            sampler.cancel()
+
+    ordered = sorted(latencies)
+    print(f"{requests} requests, concurrency {concurrency}: {elapsed:.1f}s, {requests / elapsed:.1f} req/s")
+    if ordered:
+        print(f"latency p50 {statistics.median(ordered):.0f} ms  p95 {ordered[int(len(ordered) * 0.95) - 1]:.0f} ms  "
+              f"max {ordered[-1]:.0f} ms")
+    print(f"responses: {dict(statuses)}")
+    if pid:
+        print(f"peak server threads: {peak_threads}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+    stub = sub.add_parser("stub", help="serve the stand-in OpenAI API")
+    stub.add_argument("--port", type=int, default=9100)
+    stub.add_argument("--latency", type=float, default=1.0, help="seconds per chat completion")
+    stub.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embeddings call")
+    run = sub.add_parser("run", help="send concurrent /query requests")
+    run.add_argument("--url", default="http://127.0.0.1:5000")
+    run.add_argument("--concurrency", type=int, default=200)
+    run.add_argument("--requests", type=int, default=1000)
+    run.add_argument("--pid", type=int, default=None, help="server process id to sample thread counts (Linux)")
+    args = parser.parse_args()
+
+    if args.command == "stub":
+        import uvicorn
+        uvicorn.run(create_stub_app(args.latency, args.embed_latency), host="127.0.0.1", port=args.port,
+                    log_level="warning")
+    else:
+        asyncio.run(run_load(args.url, args.concurrency, args.requests, args.pid))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Count new connections (= TLS handshakes against api.openai.com) per chat turn.
+
+Usage:
+    python -m benchmarks.openai_connections [--turns 5] [--gap 6]
+
+Each chat turn makes the calls of one /query: a query embedding, the intent
+call and the answer call. They run against the stand-in OpenAI API from
+benchmarks/load_query.py behind a TCP proxy that counts accepted connections.
+Two setups are compared:
+  per-service  one default OpenAI client per service (the previous layout)
+  shared       the pooled clients from app/utils/openai_client.py
+--gap is the pause between turns; it is longer than httpx's default 5 s
+keep-alive expiry, like the time a user takes to type the next message.
+No real API calls are made.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+
+from openai import OpenAI
+
+from benchmarks.load_query import create_stub_app
+
+
+class CountingProxy:
+    """Forwards TCP connections to the stand-in server and counts them"""
+
+    def __init__(self, upstream_port: int):
+        self.upstream_port = upstream_port
+        self.connections = 0
+
+    async def _pipe(self, reader, writer):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, client_reader, client_writer):
+        self.connections += 1
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.upstream_port)
+        await asyncio.gather(self._pipe(client_reader, upstream_writer), self._pipe(upstream_reader, client_writer))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_servers(latency: float) -> CountingProxy:
+    """Run the stand-in API and the counting proxy on a background event loop"""
+    import uvicorn
+
+    stub_port, proxy_port = free_port(), free_port()
+    proxy = CountingProxy(stub_port)
+    ready = threading.Event()
+
+    async def serve():
+        # The stand-in keeps idle connections open for 2 minutes, so the client pool decides reuse
+        server = uvicorn.Server(uvicorn.Config(create_stub_app(latency, 0.0), host="127.0.0.1", port=stub_port,
+                                               log_level="warning", timeout_keep_alive=120))
+        task = asyncio.create_task(server.serve())
+        await asyncio.start_server(proxy.handle, "127.0.0.1", proxy_port)
+        while not server.started:
+            await asyncio.sleep(0.01)
+        ready.set()
+        await task
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{proxy_port}/v1"
+    return proxy
+
+
+def chat_turn(embed_client: OpenAI, intent_client: OpenAI, chat_client: OpenAI, question: str) -> None:
+    embed_client.embeddings.create(model="text-embedding-ada-002", input=[question])
+    intent_client.chat.completions.create(model="gpt-4o-mini", response_format={"type": "json_object"},
+                                          messages=[{"role": "user", "content": question}])
+    chat_client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": question}])
+
+
+def run(name: str, clients: tuple, proxy: CountingProxy, turns: int, gap: float) -> None:
+    before = proxy.connections
+    latencies = []
+    for turn in range(turns):
+        if turn:
+            time.sleep(gap)
+        start = time.perf_counter()
+        chat_turn(*clients, f"question {turn}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    opened = proxy.connections - before
+    print(f"{name:12s} {opened:3d} connections over {turns} turns ({opened / turns:.2f} per turn), "
+          f"first turn {latencies[0]:.0f} ms, later turns {sum(latencies[1:]) / max(1, turns - 1):.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=6.0, help="seconds between chat turns")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in seconds per completion")
+    args = parser.parse_args()
+
+    proxy = start_servers(args.latency)
+    run("per-service", (OpenAI(), OpenAI(), OpenAI()), proxy, args.turns, args.gap)
+
+    from app.utils.openai_client import get_client
+    shared = get_client()
+    run("shared", (shared, shared, shared), proxy, args.turns, args.gap)
+
+
+if __name__ == "__main__":
+    main()
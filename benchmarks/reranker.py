@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare reranks/sec of per-request cross-encoder calls and the micro-batching worker.
+
+Usage:
+    python -m benchmarks.reranker --threads 16 --requests 200 --passages 5
+"""
+
+import argparse
+import threading
+import time
+
+from app.services.reranker import BatchingCrossEncoder
+
+PASSAGE = ("New Turbo Education offers SAT, ACT, SHSAT and ESL tutoring in 1on1 and 1on2 "
+           "formats for primary, middle and high school students. ")
+
+
+def run(score_fn, threads: int, requests: int, passages: int) -> float:
+    """Issue requests from several threads and return reranked pairs per second"""
+    pairs = [(f"how much is sat 1on{i % 4 + 1}", PASSAGE * 3) for i in range(passages)]
+    per_thread = requests // threads
+
+    def worker():
+        for _ in range(per_thread):
+            score_fn(pairs)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads * passages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="BAAI/bge-reranker-large")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--passages", type=int, default=5)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from sentence_transformers import CrossEncoder
+    model = CrossEncoder(args.model)
+
+    direct = run(lambda pairs: model.predict(pairs, show_progress_bar=False),
+                 args.threads, args.requests, args.passages)
+    batcher = BatchingCrossEncoder(model, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    batched = run(batcher.score, args.threads, args.requests, args.passages)
+
+    print(f"{args.threads} threads, {args.requests} requests x {args.passages} passages")
+    print(f"per-request predict: {direct:8.1f} reranks/sec")
+    print(f"micro-batched:       {batched:8.1f} reranks/sec ({batched / direct:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare query latency and memory of SimpleVectorStore and NumpyVectorStore.
+
+Usage:
+    python -m benchmarks.vector_store --vectors 20000 --dim 1536 --queries 200
+"""
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from app.services.numpy_vector_store import NumpyVectorStore
+
+
+def make_nodes(vectors: np.ndarray) -> list:
+    return [
+        TextNode(id_=f"node-{i}", text="", embedding=vector.tolist())
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def build_store(factory, vectors: np.ndarray):
+    """Build a store and return it with the heap it still holds once the nodes are gone"""
+    gc.collect()
+    tracemalloc.start()
+    store = factory()
+    store.add(make_nodes(vectors))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, current
+
+
+def time_queries(store, queries: np.ndarray, top_k: int):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=top_k))
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(result.ids)
+    return latencies, results
+
+
+def recall(results: list, reference: list) -> float:
+    hits = sum(len(set(r) & set(ref)) for r, ref in zip(results, reference))
+    return hits / sum(len(ref) for ref in reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dim)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    candidates = [
+        ("SimpleVectorStore", SimpleVectorStore),
+        ("NumpyVectorStore float32", lambda: NumpyVectorStore()),
+        ("NumpyVectorStore float16", lambda: NumpyVectorStore(quantization="float16")),
+        ("NumpyVectorStore int8", lambda: NumpyVectorStore(quantization="int8")),
+    ]
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, top_k={args.top_k}\n")
+    print(f"{'store':<26}{'heap MB':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}")
+    reference = None
+    for name, factory in candidates:
+        store, heap = build_store(factory, vectors)
+        latencies, results = time_queries(store, queries, args.top_k)
+        if reference is None:
+            reference = results
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{name:<26}{heap / 1e6:>10.1f}{statistics.median(latencies):>10.2f}"
+              f"{p95:>10.2f}{recall(results, reference):>10.3f}")
+        del store
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
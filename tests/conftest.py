@@ -0,0 +1,6 @@
+import os
+import sys
+
+# app.config.settings refuses to load without an API key; no test calls the API
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
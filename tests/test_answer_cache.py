@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from app.services.answer_cache import SemanticAnswerCache
+
+SCOPE = "kb:prompt"
+
+
+def same_vector(query):
+    # Every query embeds identically, so only the price entities can keep them apart
+    return [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(same_vector, similarity_threshold=0.97, max_entries=10,
+                               ttl_seconds=3600, stale_ttl_seconds=0)
+
+
+def answer(text):
+    return {"response": text}
+
+
+def test_similar_query_with_same_entities_hits(cache):
+    assert cache.get("sat 1on1 price", SCOPE) is None
+    cache.put("sat 1on1 price", SCOPE, answer("sat 1on1"))
+    assert cache.get("price of sat 1on1?", SCOPE) == answer("sat 1on1")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("sat 1on1 price", "sat 1on2 price"),
+    ("sat price", "shsat price"),
+    ("sat 1on1 price for high school", "sat 1on1 price for middle school"),
+    ("sat 1on1 price", "how much is tutoring?"),
+])
+def test_price_variants_do_not_collide(cache, first, second):
+    assert cache.get(first, SCOPE) is None
+    cache.put(first, SCOPE, answer(first))
+    assert cache.get(second, SCOPE) is None
+    cache.put(second, SCOPE, answer(second))
+    assert cache.get(first, SCOPE) == answer(first)
+    assert cache.get(second, SCOPE) == answer(second)
+
+
+def test_stale_entry_is_refreshed_with_the_refresh_callable():
+    cache = SemanticAnswerCache(same_vector, similarity_threshold=0.97, max_entries=10,
+                                ttl_seconds=0, stale_ttl_seconds=60)
+    refreshed = threading.Event()
+
+    def refresh():
+        refreshed.set()
+        return answer("refreshed")
+
+    assert cache.get_or_compute("sat price", SCOPE, lambda: answer("live"), refresh=refresh) == answer("live")
+    # Stale: served as is while the refresh runs in the background
+    assert cache.get_or_compute("sat price", SCOPE, lambda: answer("live"), refresh=refresh) == answer("live")
+    assert refreshed.wait(timeout=5)
+    cache._executor.shutdown(wait=True)
+    assert cache._entries[0]["result"] == answer("refreshed")
@@ -0,0 +1,61 @@
+import pytest
+
+from app.services.intent_detection import INTENT_RULES, IntentRuleEngine
+
+
+@pytest.fixture
+def rules():
+    return IntentRuleEngine(INTENT_RULES)
+
+
+def settled(rules, query):
+    result = rules.match(query)
+    return None if result is None else result["intent"]
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("i need to cancel my appointment", "cancel_appointment"),
+    ("can i cancel my sat class on friday?", "cancel_appointment"),
+    ("i'd like to cancel", "cancel_appointment"),
+    ("我想取消预约", "cancel_appointment"),
+    ("帮我取消明天的课", "cancel_appointment"),
+    ("how much is the sat class?", "price_query"),
+    ("how much does the sat course cost?", "price_query"),
+    ("sat 1on1 多少钱", "price_query"),
+    ("how much do you charge for sat?", "price_query"),
+    ("what are your hourly rates?", "price_query"),
+    ("what's the rate for esl 1on2?", "price_query"),
+    ("i want to book a trial class", "schedule_appointment"),
+])
+def test_obvious_intents_are_settled(rules, query, intent):
+    assert settled(rules, query) == intent
+
+
+@pytest.mark.parametrize("query", [
+    "what's your cancellation policy?",
+    "can i get a refund if i cancel my class?",
+    "is there a cancellation fee?",
+    "取消政策是什么",
+    "取消课程可以退款吗",
+])
+def test_policy_and_refund_questions_are_not_cancellations(rules, query):
+    assert settled(rules, query) != "cancel_appointment"
+
+
+@pytest.mark.parametrize("query", [
+    "how much homework is there in the sat class?",
+    "how much time does sat prep take?",
+    "how much can my sat score improve?",
+])
+def test_how_much_without_cost_wording_is_not_settled_as_price(rules, query):
+    assert settled(rules, query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "who is in charge of sat classes?",
+    "what is your pass rate?",
+    "what's the sat score improvement rate?",
+    "is the teacher in charge of homework?",
+])
+def test_charge_and_rate_without_price_wording_are_not_settled_as_price(rules, query):
+    assert settled(rules, query) != "price_query"
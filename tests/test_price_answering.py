@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.price_answering import PriceAnsweringEngine
+from app.services.price_table import PriceTable
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return PriceAnsweringEngine(PriceTable(), fuzzy_threshold=0.6, max_rows=6)
+
+
+def courses(rows):
+    return None if rows is None else sorted(f"{row.course}/{row.level_key}" for row in rows)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sat 1on1 多少钱", ["SAT 1on1 (sprint)/high", "SAT 1on1/high"]),
+    ("price of esl 1on2 for high school", ["ESL 1on2/high"]),
+    ("how much is the hornor course?", ["Hornor course 1on1/high"]),
+    ("how much is shsat 1 on 2", ["SHSAT 1on2/middle"]),
+    ("高中sat一对四多少钱", ["SAT 1on4 (regular)/high", "SAT 1on4 (summer)/high"]),
+    ("writting 1on2 price for 5th grade", ["Writing 1on2/primary"]),
+])
+def test_direct_price_lookups(engine, query, expected):
+    assert courses(engine.match(query)) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "how much homework is there in the sat class?",
+    "how much time does sat prep take?",
+    "how much can my sat score improve?",
+])
+def test_how_much_without_cost_wording_is_not_a_price_lookup(engine, query):
+    assert engine.match(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "is the sat fee refundable",
+    "what are the shsat exam registration fees?",
+    "what's the price of the official sat test?",
+    "how much is the act test fee?",
+    "sat 1on1 price, any discounts?",
+])
+def test_excluded_price_questions(engine, query):
+    assert engine.match(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "waiting list price",
+    "how much does the college essay help cost?",
+    "honer course price",
+])
+def test_fuzzy_or_generic_family_alone_falls_back(engine, query):
+    assert engine.match(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "sat 1on3 price",
+    "sat 1v3 price",
+    "price for sat in a group of 6",
+    "sat一对三多少钱",
+])
+def test_unknown_format_falls_back(engine, query):
+    assert engine.match(query) is None
@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+from app.services.vector_store import RerankScoreCache
+
+
+def node(node_id, text):
+    return SimpleNamespace(node_id=node_id, hash=str(hash(text)))
+
+
+def test_counts_hits_and_misses():
+    cache = RerankScoreCache(max_size=10)
+    chunk = node("a", "SAT 1on1 is $100 per hour")
+    assert cache.get("SAT price?", chunk) is None
+    cache.put("SAT price?", chunk, 0.9)
+    assert cache.get("sat  price", chunk) == 0.9
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_edited_chunk_and_clear_miss():
+    cache = RerankScoreCache(max_size=10)
+    cache.put("sat price", node("a", "old text"), 0.9)
+    assert cache.get("sat price", node("a", "new text")) is None
+    cache.clear()
+    assert cache.get("sat price", node("a", "old text")) is None
+    assert cache.stats()["size"] == 0
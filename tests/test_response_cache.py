@@ -0,0 +1,42 @@
+from app.services.response_cache import ResponseCache
+
+
+def cache_over(sources):
+    # source_check_seconds=0: the sources are checked on every lookup
+    return ResponseCache(max_entries=10, ttl_seconds=3600, source_check_seconds=0,
+                         sources=lambda: list(sources))
+
+
+def test_put_stores_a_value_computed_in_the_current_generation():
+    cache = cache_over(["kb-1"])
+    assert cache.get("k") is None
+    cache.put("k", "answer", generation=cache.generation())
+    assert cache.get("k") == "answer"
+
+
+def test_put_drops_a_value_computed_before_the_sources_changed():
+    sources = ["kb-1"]
+    cache = cache_over(sources)
+    assert cache.get("k") is None
+    generation = cache.generation()
+
+    sources[0] = "kb-2"
+    assert cache.get("other") is None  # notices the change
+    cache.put("k", "stale answer", generation=generation)
+    assert cache.get("k") is None
+
+
+def test_prices_change_clears_the_cache(tmp_path, monkeypatch):
+    from app.services import response_cache
+
+    prices = tmp_path / "prices.csv"
+    prices.write_text("SAT 1on1,10,1000")
+    monkeypatch.setattr(response_cache, "PRICES_CSV_PATH", str(prices))
+    cache = ResponseCache(max_entries=10, ttl_seconds=3600, source_check_seconds=0,
+                          sources=lambda: response_cache.answer_sources("kb-1"))
+    assert cache.get("k") is None
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+
+    prices.write_text("SAT 1on1,10,12000")
+    assert cache.get("k") is None
@@ -0,0 +1,32 @@
+from app.services.session_store import SUMMARY_PREFIX, SessionStore
+from app.utils.tokens import count_tokens
+
+SESSION = "session-0001"
+
+
+def prompt_tokens(history):
+    return sum(count_tokens(msg["content"][len(SUMMARY_PREFIX):] if msg["role"] == "system" else msg["content"])
+               for msg in history)
+
+
+def test_tokens_saved_compares_budget_trimmed_history(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), cache_size=10, token_budget=200)
+    for i in range(20):
+        store.append_exchange(SESSION, f"question {i} about sat classes " * 5, f"answer {i} with details " * 8)
+    before = prompt_tokens(store.history(SESSION))
+    all_turns = store.stats(SESSION)["tokens"]
+    assert before <= 200 < all_turns
+
+    tokens_saved = store.save_summary(SESSION, "The parent asked about SAT classes.", covered_turns=36)
+    after = prompt_tokens(store.history(SESSION))
+    assert tokens_saved == before - after
+    assert store.stats(SESSION)["tokens_saved"] == tokens_saved
+
+
+def test_tokens_saved_survives_a_reload(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path, cache_size=10, token_budget=200)
+    for i in range(10):
+        store.append_exchange(SESSION, f"question {i} " * 20, f"answer {i} " * 20)
+    tokens_saved = store.save_summary(SESSION, "Short summary.", covered_turns=16)
+    assert SessionStore(path, cache_size=10, token_budget=200).stats(SESSION)["tokens_saved"] == tokens_saved